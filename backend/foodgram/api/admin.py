@@ -0,0 +1,72 @@
+import json
+
+from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from .models import RequestProfile
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'created', 'method', 'path', 'view', 'status', 'duration', 'samples'
+    )
+    list_filter = ('view', 'status')
+    search_fields = ('^path',)
+    fields = (
+        'created', 'method', 'path', 'view', 'user_id', 'status',
+        'duration', 'samples', 'download', 'timeline'
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:pk>/stacks/',
+                self.admin_site.admin_view(self.stacks_view),
+                name='api_requestprofile_stacks',
+            ),
+        ] + super().get_urls()
+
+    def stacks_view(self, request, pk):
+        """
+        Стеки файлом .folded для flamegraph.pl или speedscope.
+        """
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.stacks, content_type='text/plain')
+        response['Content-Disposition'] = (
+            f'attachment; filename=profile-{pk}.folded'
+        )
+        return response
+
+    @admin.display(description='Стеки')
+    def download(self, obj):
+        return format_html(
+            '<a href="{}">profile-{}.folded</a>',
+            reverse('admin:api_requestprofile_stacks', args=(obj.pk,)),
+            obj.pk
+        )
+
+    @admin.display(description='SQL')
+    def timeline(self, obj):
+        return format_html(
+            '<table>{}</table>',
+            format_html_join(
+                '', '<tr><td>{}</td><td>{}</td><td><code>{}</code></td></tr>',
+                (
+                    (query['start'], query['duration'], query['sql'])
+                    for query in json.loads(obj.sql)
+                )
+            )
+        )
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
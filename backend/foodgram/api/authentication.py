@@ -0,0 +1,32 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from recipes.versions import get_versions
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_key(prefix, token):
+    """
+    Ключ кэша по хешу токена и версиям пользователей и токенов: смена
+    пароля, блокировка или выход сбрасывают его.
+    """
+    return ':'.join(map(str, (
+        prefix, sha256(str(token).encode()).hexdigest(),
+        *get_versions('users', 'tokens')
+    )))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с пользователем из кэша вместо запроса к базе.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_key('token', key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (user, token), settings.TOKEN_CACHE_TIMEOUT)
+        return user, token
@@ -0,0 +1,126 @@
+import gzip
+import json
+import os
+import shutil
+from hashlib import md5
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseRedirect
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+from recipes.models import Ingredient, Tag
+
+from .renderers import FastJSONRenderer
+
+CATALOGUES = {
+    'ingredients': (Ingredient, ('id', 'name', 'measurement_unit')),
+    'tags': (Tag, ('id', 'name', 'color', 'slug')),
+}
+MANIFEST = 'manifest.json'
+
+
+def write_file(path, content):
+    """
+    Атомарно пишет файл и его .gz рядом.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for target, data in ((path, content),
+                         (path + '.gz', gzip.compress(content, mtime=0))):
+        with open(target + '.tmp', 'wb') as file:
+            file.write(data)
+        os.replace(target + '.tmp', target)
+
+
+def read_manifest():
+    try:
+        with open(os.path.join(settings.CATALOGUE_ROOT, MANIFEST)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def shard_key(item):
+    letter = item['name'][:1].lower()
+    return letter if letter.isalnum() else '_'
+
+
+def build_catalogue(name):
+    """
+    Пишет снимок справочника целиком и по первой букве названия.
+    Имена файлов содержат хеш содержимого, актуальные перечислены
+    в manifest.json; файлы позапрошлых версий удаляются.
+    """
+    model, fields = CATALOGUES[name]
+    renderer = FastJSONRenderer()
+    items = list(model.objects.order_by('id').values(*fields))
+    content = renderer.render(items)
+    digest = md5(content).hexdigest()[:12]
+    shards = {}
+    for item in items:
+        shards.setdefault(shard_key(item), []).append(item)
+    entry = {
+        'full': f'{name}.{digest}.json',
+        'shards': {
+            letter: f'{name}.{digest}/{letter}.json' for letter in shards
+        },
+    }
+    root = settings.CATALOGUE_ROOT
+    manifest = read_manifest()
+    if (
+        manifest.get(name) == entry
+        and os.path.exists(os.path.join(root, entry['full']))
+    ):
+        return entry
+    write_file(os.path.join(root, entry['full']), content)
+    for letter, shard in shards.items():
+        write_file(
+            os.path.join(root, entry['shards'][letter]),
+            renderer.render(shard)
+        )
+
+    keep = {f'{name}.{digest}'}
+    if name in manifest:
+        keep.add(manifest[name]['full'].rsplit('.', 1)[0])
+    manifest[name] = entry
+    write_file(
+        os.path.join(root, MANIFEST), json.dumps(manifest).encode()
+    )
+    for filename in os.listdir(root):
+        base = filename.split('.json')[0]
+        if base.startswith(f'{name}.') and base not in keep:
+            path = os.path.join(root, filename)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+    return entry
+
+
+def catalogue_response(name, request):
+    """
+    Ответ со снимком справочника вместо запроса к базе: редирект на
+    файл при CATALOGUE_REDIRECT или сам файл (.gz, если клиент умеет).
+    None, если снимка ещё нет.
+    """
+    entry = read_manifest().get(name)
+    if not entry:
+        return None
+    path = os.path.join(settings.CATALOGUE_ROOT, entry['full'])
+    if not os.path.exists(path):
+        return None
+    if settings.CATALOGUE_REDIRECT:
+        return HttpResponseRedirect(settings.CATALOGUE_URL + entry['full'])
+    accepts_gzip = re_accepts_gzip.search(
+        request.META.get('HTTP_ACCEPT_ENCODING', '')
+    )
+    if accepts_gzip and os.path.exists(path + '.gz'):
+        response = FileResponse(
+            open(path + '.gz', 'rb'), content_type='application/json'
+        )
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = FileResponse(
+            open(path, 'rb'), content_type='application/json'
+        )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import Future
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from recipes.versions import get_versions
+from rest_framework.response import Response
+
+ENTRY_KEY = 'coalesce:{}'
+LEASE_KEY = 'coalesce-lease:{}'
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(key, func):
+    """
+    Одновременные вызовы с одним ключом в процессе ждут результата
+    первого вместо повторного вычисления; исключение получают все.
+    """
+    with _flights_lock:
+        future = _flights.get(key)
+        leader = future is None
+        if leader:
+            future = _flights[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        result = func()
+    except BaseException as error:
+        future.set_exception(error)
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+    future.set_result(result)
+    return result
+
+
+def revalidate(key, versions, compute):
+    """
+    Вычисляет ответ под арендой и кладёт в кэш; версии взяты до
+    вычисления, так что запись во время него сделает результат
+    устаревшим, а не скроет её.
+    """
+    try:
+        data, status = compute()
+        entry = {
+            'versions': versions, 'created': time.time(),
+            'data': data, 'status': status,
+        }
+        if status == 200:
+            cache.set(
+                ENTRY_KEY.format(key), entry,
+                settings.COALESCE_TIMEOUT + settings.COALESCE_STALE
+            )
+        return entry
+    finally:
+        cache.delete(LEASE_KEY.format(key))
+
+
+def wait_for_entry(key):
+    """
+    Один раз ждёт COALESCE_WAIT секунд ответа от воркера с арендой.
+    Потоки этого процесса уже ждут в single_flight, так что ждёт один
+    поток, и недолго: не дождавшись, он считает ответ сам, а не держит
+    воркер опросом кэша.
+    """
+    time.sleep(settings.COALESCE_WAIT)
+    return cache.get(ENTRY_KEY.format(key))
+
+
+def load(key, tables, compute):
+    """
+    Свежий ответ из кэша; устаревший (по времени или версиям таблиц)
+    отдаётся, пока его обновляет держатель аренды. Аренду в кэше
+    (cache.add) получает один воркер, остальные без ответа в кэше один
+    раз коротко ждут его, затем считают сами. Ответ по старым версиям
+    таблиц помечается stale.
+    """
+    versions = get_versions(*tables)
+    entry = cache.get(ENTRY_KEY.format(key))
+    if entry is not None and (
+        entry['versions'] == versions
+        and time.time() < entry['created'] + settings.COALESCE_TIMEOUT
+    ):
+        return entry
+    leased = cache.add(
+        LEASE_KEY.format(key), 1, settings.COALESCE_LEASE_TIMEOUT
+    )
+    if leased:
+        return revalidate(key, versions, compute)
+    if entry is None:
+        entry = wait_for_entry(key)
+    if entry is not None:
+        return dict(entry, stale=entry['versions'] != versions)
+    data, status = compute()
+    return {'data': data, 'status': status}
+
+
+def coalesced(*tables, anonymous_only=True):
+    """
+    Объединяет одинаковые GET к методу вьюсета: вычисляет ответ один
+    процесс и один поток, остальные получают его из кэша или ждут.
+    Ответ сбрасывается при изменении версий tables и через
+    COALESCE_TIMEOUT секунд. С anonymous_only объединяются только
+    анонимные запросы — ответы пользователям содержат их отметки.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET' or (
+                anonymous_only and not request.user.is_anonymous
+            ):
+                return method(self, request, *args, **kwargs)
+            key = md5(repr((
+                request.build_absolute_uri(),
+                request.accepted_renderer.format
+            )).encode()).hexdigest()
+
+            def compute():
+                response = method(self, request, *args, **kwargs)
+                return response.data, response.status_code
+
+            entry = single_flight(key, lambda: load(key, tables, compute))
+            response = Response(entry['data'], status=entry['status'])
+            response.stale = entry.get('stale', False)
+            return response
+        return wrapper
+    return decorator
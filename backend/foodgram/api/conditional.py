@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from functools import wraps
+from hashlib import md5
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from recipes.versions import get_versions
+
+
+def versioned(*tables, per_user=False, name=''):
+    """
+    ETag и Last-Modified по версиям таблиц для методов вьюсета:
+    повторный GET с If-None-Match/If-Modified-Since получает 304
+    без запросов к базе. Устаревший ответ из coalesced (response.stale)
+    отдаётся без них: он не соответствует текущим версиям.
+    """
+    def etag(request, *args, **kwargs):
+        parts = [
+            *get_versions(*tables),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+        ]
+        if per_user:
+            parts.append(request.user.pk)
+        return md5(repr(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(
+            max(get_versions(*tables)) / 10 ** 9, tz=timezone.utc
+        )
+
+    def decorator(view):
+        view = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if getattr(response, 'stale', False):
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+        return wrapper
+
+    return method_decorator(decorator, name=name)
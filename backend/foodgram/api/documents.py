@@ -0,0 +1,59 @@
+import json
+
+from django.db import transaction
+from recipes.models import Recipe, RecipeDocument
+
+from .readers import RECIPE_OUTPUT, read_recipes, recipe_rows
+
+
+def build_documents(recipe_ids, replace=True):
+    """
+    Пересобирает документы рецептов: представление для анонима с
+    относительной ссылкой на картинку. Без replace только добавляет
+    недостающие: чтение могло собрать данные до коммита записи и не
+    должно заменять документ, уже пересобранный после неё.
+    """
+    data = read_recipes(
+        recipe_rows(Recipe.objects.filter(id__in=recipe_ids)), None
+    )
+    documents = [
+        RecipeDocument(
+            recipe_id=item['id'], data=json.dumps(item, ensure_ascii=False)
+        )
+        for item in data
+    ]
+    # Документ могли одновременно собрать при чтении другого запроса:
+    # конфликт по recipe_id пропускается, а не даёт IntegrityError.
+    with transaction.atomic():
+        if replace:
+            RecipeDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeDocument.objects.bulk_create(documents, ignore_conflicts=True)
+    return {item['id']: item for item in data}
+
+
+def read_documents(recipe_ids, request, fields=RECIPE_OUTPUT):
+    """
+    Документы рецептов в порядке recipe_ids одним запросом к таблице
+    документов; недостающие собираются и сохраняются.
+    """
+    recipe_ids = list(recipe_ids)
+    documents = {
+        pk: json.loads(data)
+        for pk, data in RecipeDocument.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'data')
+    }
+    missing = [pk for pk in recipe_ids if pk not in documents]
+    if missing:
+        documents.update(build_documents(missing, replace=False))
+    result = []
+    for pk in recipe_ids:
+        if pk not in documents:
+            continue
+        document = documents[pk]
+        if document['image'] is not None:
+            document['image'] = request.build_absolute_uri(document['image'])
+        if fields != RECIPE_OUTPUT:
+            document = {field: document[field] for field in fields}
+        result.append(document)
+    return result
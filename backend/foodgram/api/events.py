@@ -0,0 +1,275 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication
+
+logger = logging.getLogger(__name__)
+
+RESYNC = {'type': 'resync'}
+
+
+class LocalBroker:
+    """
+    Брокер событий в памяти процесса: очередь на каждое открытое
+    соединение. Публиковать можно из любого потока.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self.lock:
+            subscribers = self.subscribers.get(user_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self.subscribers.pop(user_id, None)
+
+    @staticmethod
+    def put(queue, event):
+        """
+        Переполненная очередь заменяется событием resync: клиент не
+        успевает читать и должен перезапросить состояние.
+        """
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC)
+
+    def deliver(self, user_id, event):
+        with self.lock:
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self.put, queue, event)
+
+    def publish(self, user_id, event):
+        self.deliver(user_id, event)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Рассылка между процессами через pub/sub Redis: событие публикуется
+    в канал, а поток-слушатель каждого процесса раздаёт его своим
+    соединениям. Слушатель переподключается с растущей паузой, а
+    соединения после разрыва получают resync: события за время
+    разрыва потеряны.
+    """
+    CHANNEL = 'foodgram:events'
+    RETRY_DELAY = 0.5
+    RETRY_MAX_DELAY = 30
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured(
+                'Для RedisBroker нужен пакет redis'
+            )
+        self.client = redis.Redis.from_url(settings.EVENTS_REDIS_URL)
+        self.errors = redis.RedisError
+        self.listener = None
+
+    def subscribe(self, user_id):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(
+                    target=self.listen, name='events-listener', daemon=True
+                )
+                self.listener.start()
+        return super().subscribe(user_id)
+
+    def listen(self):
+        delay = self.RETRY_DELAY
+        connected = False
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                if connected:
+                    self.resync()
+                connected = True
+                delay = self.RETRY_DELAY
+                for message in pubsub.listen():
+                    self.receive(message)
+            except self.errors:
+                logger.warning(
+                    'Нет соединения с Redis, повтор через %s с', delay,
+                    exc_info=True
+                )
+            time.sleep(delay)
+            delay = min(delay * 2, self.RETRY_MAX_DELAY)
+
+    def receive(self, message):
+        try:
+            user_id, event = json.loads(message['data'])
+        except (TypeError, ValueError):
+            logger.warning('Некорректное событие: %r', message)
+            return
+        self.deliver(user_id, event)
+
+    def resync(self):
+        with self.lock:
+            user_ids = list(self.subscribers)
+        for user_id in user_ids:
+            self.deliver(user_id, RESYNC)
+
+    def publish(self, user_id, event):
+        """
+        Запись уже закоммичена: недоступный Redis теряет событие, но не
+        превращает ответ в ошибку.
+        """
+        try:
+            self.client.publish(self.CHANNEL, json.dumps([user_id, event]))
+        except self.errors:
+            logger.exception('Не удалось опубликовать событие')
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    with _brokers_lock:
+        if settings.EVENTS_BACKEND not in _brokers:
+            _brokers[settings.EVENTS_BACKEND] = import_string(
+                settings.EVENTS_BACKEND
+            )()
+        return _brokers[settings.EVENTS_BACKEND]
+
+
+def notify(user_id, event_type, **data):
+    """
+    После коммита отправляет событие всем открытым потокам пользователя.
+    """
+    event = {'type': event_type, **data}
+    transaction.on_commit(lambda: get_broker().publish(user_id, event))
+
+
+def format_event(number, event):
+    return (
+        f'id: {number}\nevent: {event["type"]}\n'
+        f'data: {json.dumps(event, ensure_ascii=False)}\n\n'
+    ).encode()
+
+
+def scope_token(scope):
+    """
+    Токен из заголовка Authorization или ?token= (EventSource не умеет
+    передавать заголовки).
+    """
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0].lower() == 'token':
+                return parts[1]
+    query = parse_qs(scope.get('query_string', b'').decode())
+    return query.get('token', [None])[0]
+
+
+@sync_to_async
+def authenticate(token):
+    """
+    Соединение с базой закрывается сразу: у потока событий нет конца
+    запроса, на котором Django закрыл бы его сам.
+    """
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(token)
+    except AuthenticationFailed:
+        return None
+    finally:
+        close_old_connections()
+    return user
+
+
+async def send_error(send, status, message):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps({'detail': message}).encode(),
+    })
+
+
+async def events_app(scope, receive, send):
+    """
+    ASGI-приложение /api/events/: поток server-sent events об изменениях
+    избранного, списка покупок и подписок текущего пользователя.
+    Пока событий нет, раз в EVENTS_HEARTBEAT секунд шлётся комментарий,
+    чтобы прокси не закрывали соединение.
+    """
+    token = scope_token(scope)
+    user = await authenticate(token) if token else None
+    if user is None:
+        await send_error(send, 401, 'Учетные данные не были предоставлены.')
+        return
+    broker = get_broker()
+    subscriber = broker.subscribe(user.id)
+    queue = subscriber[1]
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {settings.EVENTS_RETRY}\n\n'.encode(),
+            'more_body': True,
+        })
+        for number in itertools.count(1):
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                (getter, disconnected), timeout=settings.EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if disconnected in done:
+                getter.cancel()
+                break
+            if getter in done:
+                body = format_event(number, getter.result())
+            else:
+                getter.cancel()
+                body = b': ping\n\n'
+            await send({
+                'type': 'http.response.body', 'body': body, 'more_body': True
+            })
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(user.id, subscriber)
+
+
+async def wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
@@ -0,0 +1,193 @@
+import csv
+import gzip
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Max
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from users.models import Follow
+
+# Таблица выгрузки → (модель, поля). Внешние ключи выгружаются как id.
+EXPORTS = {
+    'recipes': (
+        Recipe,
+        ('id', 'author', 'name', 'text', 'cooking_time', 'pub_date')
+    ),
+    'recipe_ingredients': (
+        RecipeIngredient, ('id', 'recipe', 'ingredients', 'amount')
+    ),
+    'favorites': (Favorite, ('id', 'user', 'recipe', 'created')),
+    'carts': (ShoppingCart, ('id', 'user', 'recipe', 'created')),
+    'follows': (Follow, ('id', 'user', 'author')),
+}
+WATERMARKS = 'watermarks.json'
+
+
+def model_fields(model, names):
+    fields = [model._meta.get_field(name) for name in names]
+    return [
+        (field.attname, (field.target_field if field.is_relation else field))
+        for field in fields
+    ]
+
+
+class ParquetWriter:
+    extension = 'parquet'
+    TYPES = {
+        'AutoField': 'int64',
+        'BigAutoField': 'int64',
+        'IntegerField': 'int64',
+        'PositiveSmallIntegerField': 'int32',
+        'FloatField': 'float64',
+        'CharField': 'string',
+        'TextField': 'string',
+        'DateField': 'date32',
+    }
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImproperlyConfigured('Для Parquet нужен пакет pyarrow')
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([
+            (name, self.arrow_type(field)) for name, field in columns
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(
+            path, self.schema, compression='zstd'
+        )
+
+    def arrow_type(self, field):
+        internal = field.get_internal_type()
+        if internal == 'DateTimeField':
+            return self.pyarrow.timestamp('us', tz='UTC')
+        return getattr(self.pyarrow, self.TYPES[internal])()
+
+    def write(self, rows):
+        columns = zip(*rows)
+        self.writer.write_batch(self.pyarrow.RecordBatch.from_arrays(
+            [self.pyarrow.array(column, type=field.type)
+             for column, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+class CSVWriter:
+    extension = 'csv.gz'
+
+    def __init__(self, path, columns):
+        self.file = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def get_writer(format_name=None):
+    """
+    Parquet, если установлен pyarrow, иначе CSV со сжатием gzip.
+    """
+    if format_name == 'csv':
+        return CSVWriter
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        if format_name == 'parquet':
+            raise ImproperlyConfigured('Для Parquet нужен пакет pyarrow')
+        return CSVWriter
+    return ParquetWriter
+
+
+def read_watermarks(root):
+    try:
+        with open(os.path.join(root, WATERMARKS)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_watermarks(root, watermarks):
+    path = os.path.join(root, WATERMARKS)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(watermarks, file)
+    os.replace(path + '.tmp', path)
+
+
+def write_rows(writer, rows, batch_size):
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            writer.write(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        writer.write(batch)
+        total += len(batch)
+    return total
+
+
+def last_ids(names):
+    """
+    Водяные знаки выгрузки: max id таблиц, отданные только через
+    EXPORT_LAG секунд. Транзакции, уже получившие id до этого max, за
+    это время коммитятся, и их строки не останутся за водяным знаком
+    навсегда, как при max id в момент чтения.
+    """
+    untils = {}
+    for name in names:
+        model = EXPORTS[name][0]
+        untils[name] = model.objects.aggregate(last=Max('id'))['last'] or 0
+    time.sleep(settings.EXPORT_LAG)
+    return untils
+
+
+def export_table(name, root, writer_class, since=0, until=None,
+                 batch_size=None):
+    """
+    Выгружает строки с id в (since, until] (по умолчанию — по last_ids)
+    в новый файл таблицы. Строки читаются серверным курсором по
+    batch_size и пишутся пачками, так что память не зависит от размера
+    таблицы. Файл появляется под своим именем только целиком.
+    Инкрементальная выгрузка только дописывает новые строки: изменения
+    и удаления уже выгруженных (правка рецепта, удаление из избранного)
+    попадают в файлы лишь при полной выгрузке.
+    Возвращает (число строк, новый водяной знак).
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    model, names = EXPORTS[name]
+    if until is None:
+        until = last_ids([name])[name]
+    until = until or since
+    if until <= since:
+        return 0, since
+    directory = os.path.join(root, name)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(
+        directory, f'{name}-{since + 1}-{until}.{writer_class.extension}'
+    )
+    rows = model.objects.filter(
+        id__gt=since, id__lte=until
+    ).order_by().values_list(*names).iterator(chunk_size=batch_size)
+    writer = writer_class(path + '.tmp', model_fields(model, names))
+    try:
+        total = write_rows(writer, rows, batch_size)
+    except BaseException:
+        writer.close()
+        os.remove(path + '.tmp')
+        raise
+    writer.close()
+    os.replace(path + '.tmp', path)
+    return total, until
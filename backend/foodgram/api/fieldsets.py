@@ -0,0 +1,42 @@
+def parse_fields(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {field.strip() for field in value.split(',') if field.strip()}
+
+
+def select_fields(request, fields, embedded=()):
+    """
+    Поля ответа по параметрам запроса:
+    ?fields= оставляет только перечисленные поля,
+    ?expand= добавляет к ним вложенные объекты из embedded,
+    ?omit= убирает поля.
+    Без параметров возвращаются все поля в исходном порядке.
+    """
+    if request is None:
+        return tuple(fields)
+    only = parse_fields(request, 'fields')
+    omit = parse_fields(request, 'omit') or set()
+    if only is not None:
+        only |= (parse_fields(request, 'expand') or set()) & set(embedded)
+    return tuple(
+        field for field in fields
+        if (only is None or field in only) and field not in omit
+    )
+
+
+class SparseFieldsMixin:
+    """
+    Убирает из сериализатора поля, не запрошенные через ?fields=,
+    ?omit= и ?expand=, так что их запросы к базе не выполняются.
+    """
+    embedded_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or not hasattr(request, 'query_params'):
+            return
+        keep = select_fields(request, self.fields, self.embedded_fields)
+        for name in set(self.fields) - set(keep):
+            self.fields.pop(name)
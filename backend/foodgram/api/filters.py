@@ -1,5 +1,10 @@
+from django.db.models import F, Q
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Ingredient, Recipe
+from recipes.writebehind import recipe_filter
+from users.models import User
+
+from .prefetch import tag_map
 
 
 class IngredientFilter(FilterSet):
@@ -10,9 +15,38 @@ class IngredientFilter(FilterSet):
         fields = ['name']
 
 
+class UserFilter(FilterSet):
+    """
+    Поиск пользователей по началу никнейма или почты. startswith (LIKE
+    'x%') обслуживают индексы *_like с varchar_pattern_ops, которые
+    PostgreSQL-бэкенд Django создаёт для уникальных username и email.
+    """
+    search = filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = User
+        fields = ('search',)
+
+    def filter_search(self, queryset, name, value):
+        return queryset.filter(
+            Q(username__startswith=value) | Q(email__startswith=value)
+        )
+
+
+class TagSlugsFilter(filters.MultipleChoiceFilter):
+    """Слаги тегов из справочника в памяти, без запроса на каждый список."""
+
+    @property
+    def field(self):
+        self.extra['choices'] = [
+            (tag['slug'], tag['slug']) for tag in tag_map.get().values()
+        ]
+        return super().field
+
+
 class RecipeFilter(FilterSet):
     """Фильтр рецептов по автору/тегу/подписке/наличию в списке покупок"""
-    tags = filters.AllValuesMultipleFilter(
+    tags = TagSlugsFilter(
         field_name='tags__slug'
     )
     author = filters.NumberFilter(
@@ -22,6 +56,10 @@ class RecipeFilter(FilterSet):
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    ordering = filters.ChoiceFilter(
+        choices=(('trending', 'trending'), ('popular', 'popular')),
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
@@ -30,11 +68,17 @@ class RecipeFilter(FilterSet):
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(in_favorite__user=user)
+            return queryset.filter(recipe_filter('favorite', user.id))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(is_shopping_cart__user=user)
+            return queryset.filter(recipe_filter('cart', user.id))
         return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        """Сначала рецепты с большим рейтингом, без рейтинга — в конце."""
+        return queryset.order_by(
+            F(f'ranking__{value}').desc(nulls_last=True), '-pub_date', '-id'
+        )
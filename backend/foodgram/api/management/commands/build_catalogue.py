@@ -0,0 +1,23 @@
+from api.catalogue import CATALOGUES, build_catalogue
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Собирает JSON-снимки справочников ингредиентов и тегов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'catalogues', nargs='*',
+            help=f'{", ".join(sorted(CATALOGUES))}; по умолчанию все'
+        )
+
+    def handle(self, *args, **options):
+        names = options['catalogues'] or sorted(CATALOGUES)
+        unknown = set(names) - set(CATALOGUES)
+        if unknown:
+            raise CommandError(f'Неизвестные справочники: {unknown}')
+        for name in names:
+            entry = build_catalogue(name)
+            self.stdout.write(
+                f"{name}: {entry['full']}, шардов {len(entry['shards'])}"
+            )
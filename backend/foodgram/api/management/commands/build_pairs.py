@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.pairs import build_pairs
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сочетания ингредиентов по всем рецептам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Соседей на ингредиент.')
+        parser.add_argument(
+            '--min-recipes', type=int,
+            help='Минимум общих рецептов для пары.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = build_pairs(options['limit'], options['min_recipes'])
+        self.stdout.write(
+            f'Пар: {created} за {time.perf_counter() - started:.1f} с'
+        )
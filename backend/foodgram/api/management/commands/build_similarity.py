@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.similarity import update_signatures
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает MinHash-подписи всех рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ids = list(Recipe.objects.values_list('id', flat=True))
+        size = options['batch_size']
+        for start in range(0, len(ids), size):
+            update_signatures(ids[start:start + size])
+        self.stdout.write(f'Подписей: {len(ids)}')
@@ -0,0 +1,49 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from users.graph import follow_graph
+from users.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет is_subscribed графа подписок в памяти с запросами к Follow '
+        'и замеряет время обоих.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        ids = list(User.objects.values_list('id', flat=True))
+        if not ids:
+            raise CommandError('Нет пользователей')
+        rng = random.Random(options['seed'])
+        follows = list(Follow.objects.values_list('user_id', 'author_id'))
+        pairs = rng.sample(follows, min(len(follows), options['checks'] // 2))
+        pairs += [
+            (rng.choice(ids), rng.choice(ids))
+            for _ in range(options['checks'] - len(pairs))
+        ]
+
+        def query(user_id, author_id):
+            return Follow.objects.filter(
+                user_id=user_id, author_id=author_id
+            ).exists()
+
+        started = time.perf_counter()
+        follow_graph.refresh()
+        self.stdout.write(
+            f'загрузка графа: {(time.perf_counter() - started) * 1000:.1f} ms'
+        )
+        results = {}
+        for name, func in (('query', query),
+                           ('graph', follow_graph.is_subscribed)):
+            started = time.perf_counter()
+            results[name] = [func(*pair) for pair in pairs]
+            elapsed = (time.perf_counter() - started) / len(pairs)
+            self.stdout.write(f'{name}: {elapsed * 1e6:.1f} µs на проверку')
+        if results['query'] != results['graph']:
+            raise CommandError('Граф подписок расходится с таблицей Follow')
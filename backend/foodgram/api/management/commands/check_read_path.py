@@ -0,0 +1,52 @@
+import time
+
+from api.readers import read_recipes, recipe_rows
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipesSerializer
+from api.views import RecipesViewSet
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет побайтно ответ быстрого пути чтения рецептов с '
+        'RecipesSerializer и замеряет время обоих.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--user', help='email пользователя для флагов')
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        if options['user']:
+            request.user = User.objects.get(email=options['user'])
+        queryset = RecipesViewSet.queryset.all()[:options['limit']]
+
+        def serializer_path():
+            return JSONRenderer().render(RecipesSerializer(
+                queryset.all(), many=True, context={'request': request}
+            ).data)
+
+        def fast_path():
+            return FastJSONRenderer().render(
+                read_recipes(recipe_rows(queryset.all()), request)
+            )
+
+        if serializer_path() != fast_path():
+            raise CommandError('Ответы сериализатора и быстрого пути '
+                               'отличаются')
+        for name, func in (('serializer', serializer_path),
+                           ('fast', fast_path)):
+            started = time.process_time()
+            for _ in range(options['repeat']):
+                func()
+            elapsed = (time.process_time() - started) / options['repeat']
+            self.stdout.write(f'{name}: {elapsed * 1000:.2f} ms CPU')
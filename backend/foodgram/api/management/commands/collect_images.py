@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.storage import image_storage
+
+IMAGES_DIR = Recipe._meta.get_field('image').upload_to
+
+
+def walk(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield f'{path}/{name}'
+    for directory in directories:
+        yield from walk(storage, f'{path}/{directory}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки рецептов, на которые не ссылается ни один '
+        'рецепт и которые старше IMAGE_GC_GRACE секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if not image_storage.exists(IMAGES_DIR):
+            return
+        referenced = set(Recipe.objects.values_list('image', flat=True))
+        deadline = time.time() - settings.IMAGE_GC_GRACE
+        removed = freed = 0
+        for name in walk(image_storage, IMAGES_DIR):
+            if name in referenced:
+                continue
+            if image_storage.get_modified_time(name).timestamp() > deadline:
+                continue
+            # Рецепт мог сослаться на файл после чтения referenced.
+            if Recipe.objects.filter(image=name).exists():
+                continue
+            freed += image_storage.size(name)
+            removed += 1
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                image_storage.delete(name)
+        self.stdout.write(f'Удалено файлов: {removed}, {freed} байт')
@@ -0,0 +1,50 @@
+import time
+
+from api.export import (EXPORTS, export_table, get_writer, last_ids,
+                        read_watermarks, write_watermarks)
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает рецепты, состав, избранное, списки покупок и подписки '
+        'в Parquet (или csv.gz без pyarrow). По умолчанию только строки, '
+        'добавленные после прошлой выгрузки: изменения и удаления уже '
+        'выгруженных строк попадают в файлы только с --full.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables', nargs='*',
+            help=f'{", ".join(EXPORTS)}; по умолчанию все'
+        )
+        parser.add_argument('--output', default=settings.EXPORT_ROOT)
+        parser.add_argument('--format', choices=('parquet', 'csv'))
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Выгрузить таблицы целиком, без водяного знака.'
+        )
+
+    def handle(self, *args, **options):
+        tables = options['tables'] or list(EXPORTS)
+        unknown = set(tables) - set(EXPORTS)
+        if unknown:
+            raise CommandError(f'Неизвестные таблицы: {", ".join(unknown)}')
+        root = options['output']
+        writer = get_writer(options['format'])
+        watermarks = read_watermarks(root)
+        untils = last_ids(tables)
+        for name in tables:
+            started = time.perf_counter()
+            since = 0 if options['full'] else watermarks.get(name, 0)
+            total, watermarks[name] = export_table(
+                name, root, writer, since, untils[name],
+                options['batch_size']
+            )
+            write_watermarks(root, watermarks)
+            self.stdout.write(
+                f'{name}: {total} строк до id {watermarks[name]} '
+                f'за {time.perf_counter() - started:.1f} с'
+            )
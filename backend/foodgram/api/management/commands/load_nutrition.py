@@ -0,0 +1,67 @@
+import csv
+
+from api.signals import recipes_changed
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import Ingredient, IngredientNutrition, Recipe
+from recipes.nutrition import NUTRIENTS
+from recipes.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает пищевую ценность ингредиентов из CSV со столбцами '
+        'name,measurement_unit,calories,proteins,fats,carbohydrates'
+        '[,unit_weight] (на 100 г).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        }
+        facts, skipped = {}, 0
+        try:
+            with open(options['path'], encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    pk = ingredients.get(
+                        (row['name'].strip(), row['measurement_unit'].strip())
+                    )
+                    if pk is None:
+                        skipped += 1
+                        continue
+                    facts[pk] = IngredientNutrition(
+                        ingredient_id=pk,
+                        unit_weight=float(row['unit_weight'])
+                        if row.get('unit_weight') else None,
+                        **{name: float(row[name]) for name in NUTRIENTS}
+                    )
+        except (OSError, KeyError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать файл: {error}')
+
+        existing = set(IngredientNutrition.objects.filter(
+            ingredient_id__in=facts
+        ).values_list('ingredient_id', flat=True))
+        IngredientNutrition.objects.bulk_create(
+            [item for pk, item in facts.items() if pk not in existing],
+            batch_size=options['batch_size']
+        )
+        IngredientNutrition.objects.bulk_update(
+            [item for pk, item in facts.items() if pk in existing],
+            ['unit_weight', *NUTRIENTS],
+            batch_size=options['batch_size']
+        )
+        bump_version('nutrition')
+        recipes_changed(Recipe.objects.filter(
+            ingredients__in=facts
+        ).values_list('id', flat=True).distinct())
+        self.stdout.write(
+            f'Загружено {len(facts)}, пропущено {skipped} строк'
+        )
@@ -0,0 +1,46 @@
+from api.signals import recipes_changed
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.duplicates import find_duplicates, merge_duplicates, plan_merges
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Ищет почти одинаковые ингредиенты с одной единицей измерения '
+        'и предлагает слияния; с --apply сливает их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold', type=float,
+            help='Минимальная мера Жаккара по триграммам названий.'
+        )
+        parser.add_argument(
+            '--apply', action='store_true',
+            help='Слить дубликаты, а не только показать их.'
+        )
+
+    def handle(self, *args, **options):
+        plan = plan_merges(find_duplicates(options['threshold']))
+        names = Ingredient.objects.in_bulk([
+            item for target, duplicates in plan.items()
+            for item in (target, *duplicates)
+        ])
+        for target, duplicates in plan.items():
+            self.stdout.write(
+                f'{names[target]} ({target}) ← ' + ', '.join(
+                    f'{names[item]} ({item})' for item in duplicates
+                )
+            )
+        total = sum(len(duplicates) for duplicates in plan.values())
+        if not options['apply']:
+            self.stdout.write(f'Дубликатов: {total}; для слияния --apply')
+            return
+        with transaction.atomic():
+            recipe_ids = merge_duplicates(plan)
+            recipes_changed(recipe_ids)
+        self.stdout.write(
+            f'Слито дубликатов: {total}, изменено рецептов: '
+            f'{len(recipe_ids)}. Сочетания пересчитываются build_pairs.'
+        )
@@ -0,0 +1,64 @@
+import json
+
+from api.models import RequestProfile
+from api.profiling import profile_token
+from django.core.management.base import BaseCommand, CommandError
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Профили запросов: список последних, выгрузка стеков в .folded '
+        'и SQL, значение заголовка X-Profile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--view', help='Только профили этого view.')
+        parser.add_argument('--export', type=int, metavar='ID')
+        parser.add_argument(
+            '--output', help='Файл для стеков, по умолчанию profile-ID.folded'
+        )
+        parser.add_argument(
+            '--token', metavar='EMAIL',
+            help='Напечатать значение заголовка X-Profile для сотрудника.'
+        )
+
+    def handle(self, *args, **options):
+        if options['token']:
+            user = User.objects.filter(
+                email=options['token'], is_staff=True
+            ).first()
+            if user is None:
+                raise CommandError(
+                    f'Сотрудник {options["token"]} не найден'
+                )
+            self.stdout.write(profile_token(user))
+            return
+        if options['export']:
+            self.export(options['export'], options['output'])
+            return
+        profiles = RequestProfile.objects.all()
+        if options['view']:
+            profiles = profiles.filter(view=options['view'])
+        for profile in profiles[:options['limit']]:
+            self.stdout.write(
+                f'{profile.pk}\t{profile.created:%Y-%m-%d %H:%M:%S}\t'
+                f'{profile.status}\t{profile.duration:.1f} мс\t'
+                f'{profile.samples}\t{profile.method} {profile.path}'
+            )
+
+    def export(self, pk, output):
+        try:
+            profile = RequestProfile.objects.get(pk=pk)
+        except RequestProfile.DoesNotExist:
+            raise CommandError(f'Профиль {pk} не найден')
+        output = output or f'profile-{pk}.folded'
+        with open(output, 'w') as file:
+            file.write(profile.stacks + '\n')
+        self.stdout.write(f'Стеки: {output}')
+        for query in json.loads(profile.sql):
+            self.stdout.write(
+                f'{query["start"]:>10.2f} {query["duration"]:>8.2f} мс  '
+                f'{query["sql"]}'
+            )
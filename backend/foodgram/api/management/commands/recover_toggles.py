@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from recipes.writebehind import recover_logs
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает в базу журналы буфера избранного и списка покупок, '
+        'оставшиеся от остановленных процессов.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Событий: {recover_logs()}')
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.rankings import reset_rankings, update_rankings
+
+
+class Command(BaseCommand):
+    help = (
+        'Дописывает в рейтинги trending/popular добавления в избранное '
+        'и список покупок с прошлого запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--loop', type=int, default=0, metavar='SECONDS',
+            help='Повторять с заданным интервалом.'
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Пересчитать рейтинги с нуля.'
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_rankings()
+        while True:
+            processed = update_rankings(options['batch_size'])
+            self.stdout.write(f'Событий: {processed}')
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
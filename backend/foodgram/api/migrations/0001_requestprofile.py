@@ -0,0 +1,35 @@
+# Generated by Django 3.2.15 on 2026-10-19 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Создан')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=500, verbose_name='Путь')),
+                ('view', models.CharField(max_length=200, verbose_name='View')),
+                ('user_id', models.IntegerField(null=True, verbose_name='Пользователь')),
+                ('status', models.PositiveSmallIntegerField(verbose_name='Статус')),
+                ('duration', models.FloatField(verbose_name='Время, мс')),
+                ('samples', models.PositiveIntegerField(verbose_name='Сэмплов')),
+                ('stacks', models.TextField(verbose_name='Стеки (collapsed)')),
+                ('sql', models.TextField(verbose_name='SQL (JSON)')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """
+    Профиль запроса: стеки сэмплирующего профилировщика в collapsed-
+    формате (строки «a;b;c N» для flamegraph.pl или speedscope) и
+    SQL-запросы с временем начала и длительностью.
+    """
+    created = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name='Создан'
+    )
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(max_length=500, verbose_name='Путь')
+    view = models.CharField(max_length=200, verbose_name='View')
+    user_id = models.IntegerField(null=True, verbose_name='Пользователь')
+    status = models.PositiveSmallIntegerField(verbose_name='Статус')
+    duration = models.FloatField(verbose_name='Время, мс')
+    samples = models.PositiveIntegerField(verbose_name='Сэмплов')
+    stacks = models.TextField(verbose_name='Стеки (collapsed)')
+    sql = models.TextField(verbose_name='SQL (JSON)')
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} – {self.duration:.0f} мс'
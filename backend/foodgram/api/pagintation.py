@@ -1,5 +1,36 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from recipes.paginator import CountCachingPaginator
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountCachingPaginator(
+            object_list, per_page, versions=self.count_versions
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_versions = getattr(view, 'count_versions', ())
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_exact', self.page.paginator.count_exact),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_exact'] = {
+            'type': 'boolean',
+        }
+        return response_schema
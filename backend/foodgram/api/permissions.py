@@ -12,6 +12,16 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         )
 
 
+class IsAdmin(permissions.BasePermission):
+    """
+    Разрешение только для админа.
+    """
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (
+            request.user.is_admin or request.user.is_superuser
+        )
+
+
 class IsAdminAuthorOrReadOnly(permissions.BasePermission):
     """
     Разрешение для админа, автора или только чтение.
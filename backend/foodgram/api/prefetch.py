@@ -0,0 +1,56 @@
+from recipes.models import Recipe, Tag
+from recipes.versions import get_version
+
+
+class TagMap:
+    """
+    Справочник тегов в памяти процесса, сверяемый с версией таблицы.
+    """
+    fields = ('id', 'name', 'color', 'slug')
+
+    def __init__(self):
+        self.version = None
+        self.tags = {}
+
+    def get(self, required=()):
+        version = get_version('tags')
+        if version != self.version or not self.tags.keys() >= set(required):
+            self.tags = {
+                tag['id']: tag
+                for tag in Tag.objects.values(*self.fields)
+            }
+            self.version = version
+        return self.tags
+
+
+tag_map = TagMap()
+
+
+def recipe_tags(recipe_ids):
+    """
+    Теги рецептов одним запросом к промежуточной таблице.
+    """
+    links = {recipe_id: [] for recipe_id in recipe_ids}
+    if not links:
+        return links
+    rows = list(Recipe.tags.through.objects.filter(
+        recipe_id__in=links
+    ).order_by('tag_id').values_list('recipe_id', 'tag_id'))
+    tags = tag_map.get(required={tag_id for _, tag_id in rows})
+    for recipe_id, tag_id in rows:
+        if tag_id in tags:
+            links[recipe_id].append(dict(tags[tag_id]))
+    return links
+
+
+def attach_tags(recipes):
+    """
+    Проставляет рецептам теги одним запросом к промежуточной таблице.
+    """
+    recipes = [
+        recipe for recipe in recipes
+        if not hasattr(recipe, 'tag_data')
+    ]
+    links = recipe_tags(recipe.id for recipe in recipes)
+    for recipe in recipes:
+        recipe.tag_data = links[recipe.id]
@@ -0,0 +1,161 @@
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from rest_framework.exceptions import APIException
+
+from .models import RequestProfile
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_SALT = 'api.profiling'
+
+
+def profile_token(user):
+    """
+    Значение заголовка X-Profile для сотрудника user: подписанные id
+    пользователя и срок действия (PROFILE_TOKEN_MAX_AGE секунд).
+    """
+    return signing.dumps(
+        {'user': user.id,
+         'expires': int(time.time()) + settings.PROFILE_TOKEN_MAX_AGE},
+        salt=PROFILE_SALT
+    )
+
+
+def token_allows(token, user):
+    try:
+        payload = signing.loads(token, salt=PROFILE_SALT)
+    except signing.BadSignature:
+        return False
+    return (
+        payload.get('expires', 0) > time.time()
+        and user.is_authenticated and user.is_staff
+        and payload.get('user') == user.id
+    )
+
+
+def prune_profiles():
+    """
+    Оставляет PROFILE_KEEP последних профилей.
+    """
+    stale = RequestProfile.objects.order_by('-id').values_list(
+        'id', flat=True
+    )[settings.PROFILE_KEEP:settings.PROFILE_KEEP + 1]
+    if stale:
+        RequestProfile.objects.filter(id__lte=stale[0]).delete()
+
+
+def frame_name(frame):
+    return f'{frame.f_globals.get("__name__", "?")}.{frame.f_code.co_name}'
+
+
+class Sampler(threading.Thread):
+    """
+    Раз в PROFILE_INTERVAL секунд снимает стек потока запроса через
+    sys._current_frames(); сам поток запроса не замедляется.
+    """
+
+    def __init__(self, thread_id):
+        super().__init__(name='profiler', daemon=True)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(settings.PROFILE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class SQLTimeline:
+    """
+    execute_wrapper, записывающий начало и длительность каждого запроса
+    относительно начала профиля.
+    """
+
+    def __init__(self, started):
+        self.started = started
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            end = time.perf_counter()
+            self.queries.append({
+                'start': round((start - self.started) * 1000, 3),
+                'duration': round((end - start) * 1000, 3),
+                'sql': sql[:settings.PROFILE_SQL_LENGTH],
+            })
+
+
+class ProfiledViewMixin:
+    """
+    Для выбранных запросов (доля PROFILE_SAMPLE_RATE или подписанный
+    заголовок X-Profile) снимает профиль dispatch и сохраняет его в
+    RequestProfile; хранятся PROFILE_KEEP последних.
+    """
+
+    def should_profile(self, request):
+        """
+        Заголовок X-Profile действует только для сотрудника, которому
+        выдан, и до срока в токене; пользователь определяется той же
+        аутентификацией DRF, что и в самом запросе. Ошибку аутентификации
+        здесь не поднимаем: запрос без профиля получит её в dispatch.
+        """
+        token = request.META.get(PROFILE_HEADER)
+        if token:
+            try:
+                user = self.initialize_request(request).user
+            except APIException:
+                return False
+            return token_allows(token, user)
+        rate = settings.PROFILE_SAMPLE_RATE
+        return bool(rate) and random.random() < rate
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.should_profile(request):
+            return super().dispatch(request, *args, **kwargs)
+        started = time.perf_counter()
+        sampler = Sampler(threading.get_ident())
+        timeline = SQLTimeline(started)
+        sampler.start()
+        try:
+            with connection.execute_wrapper(timeline):
+                response = super().dispatch(request, *args, **kwargs)
+        finally:
+            sampler.stop()
+        duration = (time.perf_counter() - started) * 1000
+        user = getattr(self.request, 'user', None)
+        RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            view=f'{type(self).__name__}.{getattr(self, "action", "")}'[:200],
+            user_id=user.id if user is not None else None,
+            status=response.status_code,
+            duration=duration,
+            samples=sum(sampler.stacks.values()),
+            stacks='\n'.join(
+                f'{stack} {count}'
+                for stack, count in sampler.stacks.most_common()
+            ),
+            sql=json.dumps(timeline.queries, ensure_ascii=False),
+        )
+        prune_profiles()
+        return response
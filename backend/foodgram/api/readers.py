@@ -0,0 +1,126 @@
+from operator import itemgetter
+
+from recipes.models import Recipe, RecipeIngredient
+from recipes.nutrition import recipe_nutrition
+from recipes.writebehind import KINDS, apply_pending
+from users.graph import follow_graph
+
+from .prefetch import recipe_tags
+
+RECIPE_OUTPUT = (
+    'id', 'tags', 'ingredients', 'image', 'name',
+    'text', 'cooking_time', 'author',
+    'is_favorited', 'is_in_shopping_cart', 'nutrition',
+)
+RECIPE_EMBEDDED = ('tags', 'ingredients', 'author')
+RECIPE_COLUMNS = ('image', 'name', 'text', 'cooking_time')
+AUTHOR_COLUMNS = (
+    'author_id', 'author__email', 'author__username',
+    'author__first_name', 'author__last_name',
+)
+
+
+def image_url(name, request):
+    """
+    Ссылка на картинку так же, как её отдаёт ImageField сериализатора.
+    """
+    if not name:
+        return None
+    url = Recipe._meta.get_field('image').storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def recipe_ingredients(recipe_ids):
+    """
+    Ингредиенты рецептов одним запросом.
+    """
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    rows = RecipeIngredient.objects.filter(
+        recipe_id__in=ingredients
+    ).order_by('id').values_list(
+        'recipe_id', 'ingredients_id', 'ingredients__name',
+        'ingredients__measurement_unit', 'amount'
+    )
+    for recipe_id, pk, name, measurement_unit, amount in rows:
+        ingredients[recipe_id].append({
+            'id': pk,
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'amount': amount,
+        })
+    return ingredients
+
+
+def user_flags(kind, ids, user):
+    """
+    Множество id рецептов, которые пользователь добавил в избранное
+    (kind='favorite') или список покупок (kind='cart'), с учётом буфера.
+    """
+    if user is None or user.is_anonymous or not ids:
+        return set()
+    model = KINDS[kind][0]
+    saved = model.objects.filter(
+        user=user, recipe_id__in=ids
+    ).values_list('recipe_id', flat=True)
+    return apply_pending(kind, user.id, saved) & set(ids)
+
+
+def recipe_rows(queryset, fields=RECIPE_OUTPUT):
+    """
+    Строки рецептов для read_recipes только с нужными колонками.
+    """
+    columns = ['id']
+    columns.extend(column for column in RECIPE_COLUMNS if column in fields)
+    if 'author' in fields:
+        columns.extend(AUTHOR_COLUMNS)
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def read_recipes(rows, request, fields=RECIPE_OUTPUT):
+    """
+    Представление рецептов (как у RecipesSerializer) из строк
+    recipe_rows без создания моделей и полей сериализатора.
+    Для полей, которых нет в fields, запросы не выполняются.
+    """
+    rows = list(rows)
+    ids = [row['id'] for row in rows]
+    user = getattr(request, 'user', None)
+    getters = {
+        'id': itemgetter('id'),
+        'image': lambda row: image_url(row['image'], request),
+        'name': itemgetter('name'),
+        'text': itemgetter('text'),
+        'cooking_time': itemgetter('cooking_time'),
+    }
+    if 'tags' in fields:
+        tags = recipe_tags(ids)
+        getters['tags'] = lambda row: tags[row['id']]
+    if 'ingredients' in fields:
+        ingredients = recipe_ingredients(ids)
+        getters['ingredients'] = lambda row: ingredients[row['id']]
+    if 'author' in fields:
+        subscribed = set()
+        if user is not None and user.is_authenticated:
+            subscribed = follow_graph.subscribed(
+                user.id, {row['author_id'] for row in rows}
+            )
+        getters['author'] = lambda row: {
+            'id': row['author_id'],
+            'email': row['author__email'],
+            'username': row['author__username'],
+            'first_name': row['author__first_name'],
+            'last_name': row['author__last_name'],
+            'is_subscribed': row['author_id'] in subscribed,
+        }
+    if 'is_favorited' in fields:
+        favorited = user_flags('favorite', ids, user)
+        getters['is_favorited'] = lambda row: row['id'] in favorited
+    if 'is_in_shopping_cart' in fields:
+        in_cart = user_flags('cart', ids, user)
+        getters['is_in_shopping_cart'] = lambda row: row['id'] in in_cart
+    if 'nutrition' in fields:
+        nutrition = recipe_nutrition(ids)
+        getters['nutrition'] = lambda row: nutrition[row['id']]
+    return [{field: getters[field](row) for field in fields} for row in rows]
@@ -1,10 +1,17 @@
+from django.db import models, transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.models import (Favorite, Ingredient, IngredientPair, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.nutrition import recipe_nutrition
+from recipes.writebehind import KINDS, apply_pending
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from users.models import Follow, User
+from users.graph import follow_graph
+from users.models import User
+
+from .fieldsets import SparseFieldsMixin
+from .prefetch import attach_tags
 
 CONSTANT = 6
 
@@ -35,7 +42,7 @@ class CreateUsersSerializer(UserCreateSerializer):
         return user
 
 
-class UsersSerializer(UserSerializer):
+class UsersSerializer(SparseFieldsMixin, UserSerializer):
     """
     Отображает пользователя.
     """
@@ -53,7 +60,7 @@ class UsersSerializer(UserSerializer):
         request = self.context.get('request')
         if not request or request.user.is_anonymous:
             return False
-        return Follow.objects.filter(user=request.user, author=obj.id).exists()
+        return follow_graph.is_subscribed(request.user.id, obj.id)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -79,6 +86,27 @@ class IngredientsSerializer(serializers.ModelSerializer):
         )
 
 
+class IngredientPairSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для вывода ингредиентов, сочетающихся с данным.
+    """
+    id = serializers.ReadOnlyField(source='pair.id')
+    name = serializers.ReadOnlyField(source='pair.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='pair.measurement_unit'
+    )
+
+    class Meta:
+        model = IngredientPair
+        fields = (
+            'id',
+            'name',
+            'measurement_unit',
+            'recipes',
+            'score'
+        )
+
+
 class IngredientInRecipesSerializer(serializers.ModelSerializer):
     """
     Выводит информацию о ингредиентах в рецептах
@@ -97,15 +125,40 @@ class IngredientInRecipesSerializer(serializers.ModelSerializer):
         ]
 
 
-class ShortInfoRecipesSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    Подгружает теги сразу для всей пачки рецептов.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        recipes = list(data)
+        attach_tags(recipes)
+        return super().to_representation(recipes)
+
+
+class RecipeTagsMixin:
+    """
+    Теги рецепта из общего справочника без запроса на каждую строку.
+    """
+
+    def get_tags(self, obj):
+        attach_tags([obj])
+        return obj.tag_data
+
+
+class ShortInfoRecipesSerializer(RecipeTagsMixin,
+                                 serializers.ModelSerializer):
     """
     Вывод краткой информации о рецепте
     """
-    tags = TagSerializer(read_only=True, many=True)
+    tags = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'name', 'image', 'cooking_time')
+        list_serializer_class = RecipeListSerializer
 
 
 class CreateIngredientRecipeSerializer(serializers.ModelSerializer):
@@ -166,6 +219,7 @@ class CreateRecipesSerializer(serializers.ModelSerializer):
                 )
             unique_ingredients.add(ingredient['id'])
         return data
+
     def create_ingredients(self, ingredients, recipe):
         RecipeIngredient.objects.bulk_create([
             RecipeIngredient(
@@ -175,6 +229,7 @@ class CreateRecipesSerializer(serializers.ModelSerializer):
             ) for ingredient in ingredients]
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         request = self.context.get('request')
@@ -187,6 +242,7 @@ class CreateRecipesSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients=ingredients_data, recipe=recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop("ingredients")
@@ -206,19 +262,20 @@ class CreateRecipesSerializer(serializers.ModelSerializer):
         ).data
 
 
-class RecipesSerializer(serializers.ModelSerializer):
+class RecipesSerializer(RecipeTagsMixin, serializers.ModelSerializer):
     """
     Для просмотра полной информации о рецептах.
     """
     id = serializers.IntegerField()
     image = Base64ImageField()
-    tags = TagSerializer(read_only=True, many=True)
+    tags = serializers.SerializerMethodField(read_only=True)
     ingredients = IngredientInRecipesSerializer(
         many=True, source='recipe_ingredients'
     )
     author = UsersSerializer(read_only=True)
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    nutrition = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Recipe
@@ -226,19 +283,23 @@ class RecipesSerializer(serializers.ModelSerializer):
             'id', 'tags', 'ingredients',
             'image', 'name',
             'text', 'cooking_time', 'author',
-            'is_favorited', 'is_in_shopping_cart'
+            'is_favorited', 'is_in_shopping_cart', 'nutrition'
         )
+        list_serializer_class = RecipeListSerializer
 
     @staticmethod
-    def get_is(model, user, obj):
+    def get_is(kind, user, obj):
         """
         Функция для favorite and shopping_cart.
         """
         if user.is_anonymous:
             return False
-        return model.objects.filter(
-            recipe=obj
+        saved = KINDS[kind][0].objects.filter(
+            user=user, recipe=obj
         ).exists()
+        return obj.id in apply_pending(
+            kind, user.id, [obj.id] if saved else []
+        )
 
     def get_is_favorited(self, obj):
         """
@@ -248,7 +309,7 @@ class RecipesSerializer(serializers.ModelSerializer):
         return self.get_is(
             user=request.user,
             obj=obj,
-            model=Favorite
+            kind='favorite'
         )
 
     def get_is_in_shopping_cart(self, obj):
@@ -259,15 +320,23 @@ class RecipesSerializer(serializers.ModelSerializer):
         return self.get_is(
             user=request.user,
             obj=obj,
-            model=ShoppingCart
+            kind='cart'
         )
 
+    def get_nutrition(self, obj):
+        """
+        Пищевая ценность рецепта.
+        """
+        return recipe_nutrition([obj.id])[obj.id]
+
 
 class FollowSerializer(UsersSerializer):
     """Сериализатор для добавления/удаления подписки, просмотра подписок."""
     recipes = serializers.SerializerMethodField(read_only=True)
     recipes_count = serializers.SerializerMethodField(read_only=True)
 
+    embedded_fields = ('recipes',)
+
     class Meta(UsersSerializer.Meta):
         fields = UsersSerializer.Meta.fields + ('recipes', 'recipes_count')
 
@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from recipes.models import (Ingredient, IngredientNutrition, Recipe,
+                            RecipeIngredient, Tag)
+from recipes.nutrition import forget_nutrition
+from recipes.similarity import update_signatures
+from users.models import User
+
+from .catalogue import build_catalogue
+from .documents import build_documents
+
+CATALOGUE_MODELS = {Ingredient: 'ingredients', Tag: 'tags'}
+USER_SERVICE_FIELDS = {'last_login', 'password'}
+
+
+def rebuild_on_commit(name, ids, func):
+    """
+    Копит id до коммита транзакции и вызывает func(ids) один раз,
+    сколько бы строк ни изменилось.
+    """
+    connection = transaction.get_connection()
+    pending = connection.__dict__.setdefault('pending_rebuilds', {})
+    scheduled = [entry[1] for entry in connection.run_on_commit]
+    if name in pending and pending[name][1] in scheduled:
+        pending[name][0].update(ids)
+        return
+
+    def rebuild():
+        func(pending.pop(name)[0])
+    pending[name] = (set(ids), rebuild)
+    transaction.on_commit(rebuild)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def catalogue_changed(sender, raw=False, **kwargs):
+    """
+    Снимок справочника пересобирается после коммита; loaddata (raw)
+    пропускается — после него запускается build_catalogue.
+    """
+    if not raw:
+        name = CATALOGUE_MODELS[sender]
+        rebuild_on_commit(name, (), lambda ids: build_catalogue(name))
+
+
+def rebuild_recipes(recipe_ids):
+    forget_nutrition(recipe_ids)
+    build_documents(recipe_ids)
+    update_signatures(recipe_ids)
+
+
+def recipes_changed(recipe_ids):
+    rebuild_on_commit('recipes', recipe_ids, rebuild_recipes)
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def tag_changed(instance, raw=False, **kwargs):
+    if not raw:
+        recipes_changed(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(instance, raw=False, **kwargs):
+    if not raw:
+        recipes_changed(instance.recipes.values_list('id', flat=True))
+
+
+@receiver((post_save, post_delete), sender=IngredientNutrition)
+def nutrition_changed(instance, raw=False, **kwargs):
+    if not raw:
+        recipes_changed(Recipe.objects.filter(
+            ingredients=instance.ingredient_id
+        ).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, raw=False, **kwargs):
+    if not raw:
+        recipes_changed((instance.id,))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, raw=False, **kwargs):
+    if not raw:
+        recipes_changed((instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipes_changed((instance.id,))
+    elif pk_set:
+        recipes_changed(pk_set)
+
+
+@receiver(post_save, sender=User)
+def author_changed(instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields and set(update_fields) <= USER_SERVICE_FIELDS):
+        return
+    recipes_changed(instance.recipes.values_list('id', flat=True))
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .renderers import FastJSONRenderer
+
+
+def stream_json_list(rows, read, chunk_size=None):
+    """
+    JSON-массив по частям: строки читаются iterator(chunk_size) и
+    каждая пачка превращается в элементы через read(batch), так что
+    память не растёт с размером выборки.
+    """
+    chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+    renderer = FastJSONRenderer()
+
+    def render(batch, first):
+        content = renderer.render(read(batch))[1:-1]
+        return content if first or not content else b',' + content
+
+    def generate():
+        yield b'['
+        batch, first = [], True
+        for row in rows.iterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) == chunk_size:
+                yield render(batch, first)
+                batch, first = [], False
+        if batch:
+            yield render(batch, first)
+        yield b']'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
@@ -0,0 +1,143 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """
+    'N/период' → (ёмкость N, пополнение в токенах в секунду).
+    """
+    number, period = rate.split('/')
+    capacity = int(number)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+class LocalBucketStore:
+    """
+    Корзины токенов в памяти воркера: у каждого воркера свой лимит.
+    Полные корзины равны отсутствующим и выбрасываются, когда ключей
+    больше THROTTLE_MAX_KEYS.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def take(self, key, capacity, rate, cost=1):
+        """
+        Списывает cost токенов; возвращает 0 или сколько секунд ждать,
+        пока их хватит.
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, _ = self.buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self.buckets) > settings.THROTTLE_MAX_KEYS:
+                self.prune(now)
+        return 0 if allowed else (cost - tokens) / rate
+
+    def prune(self, now):
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if bucket[2] > now
+        }
+
+
+class RedisBucketStore:
+    """
+    Общие для всех воркеров корзины в Redis: пополнение и списание
+    выполняются одним Lua-скриптом по часам Redis.
+    """
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+    else
+        wait = (cost - tokens) / rate
+    end
+    redis.call(
+        'HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now)
+    )
+    redis.call(
+        'PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000
+    )
+    return tostring(wait)
+    """
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured(
+                'Для RedisBucketStore нужен пакет redis'
+            )
+        client = redis.Redis.from_url(settings.THROTTLE_REDIS_URL)
+        self.script = client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate, cost=1):
+        return float(self.script(keys=[key], args=[capacity, rate, cost]))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    with _stores_lock:
+        if settings.THROTTLE_BACKEND not in _stores:
+            _stores[settings.THROTTLE_BACKEND] = import_string(
+                settings.THROTTLE_BACKEND
+            )()
+        return _stores[settings.THROTTLE_BACKEND]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Лимит по корзине токенов для действия вьюсета: область
+    '<throttle_scope>.<action>', ставка из DEFAULT_THROTTLE_RATES.
+    Действия без ставки не ограничиваются. Ключ — пользователь или
+    IP анонима; проверка не обращается к базе.
+    """
+
+    def __init__(self):
+        self.wait_time = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(
+            f'{scope}.{getattr(view, "action", None)}'
+        )
+        if scope is None or rate is None:
+            return True
+        ident = (
+            f'user:{request.user.pk}' if request.user.is_authenticated
+            else f'ip:{self.get_ident(request)}'
+        )
+        capacity, refill = parse_rate(rate)
+        self.wait_time = get_store().take(
+            f'throttle:{scope}.{view.action}:{ident}', capacity, refill
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
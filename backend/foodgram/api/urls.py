@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (CustomUserViewSet, IngredientsViewSet, RecipesViewSet,
                     TagViewSet)
+from .warmup import readiness
 
 router = DefaultRouter()
 
@@ -12,6 +13,7 @@ router.register(r'recipes', RecipesViewSet, basename='recipes')
 router.register(r'users', CustomUserViewSet, basename='users')
 
 urlpatterns = [
+    path('ready/', readiness, name='ready'),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken'))
 ]
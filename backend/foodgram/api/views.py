@@ -1,46 +1,124 @@
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.models import (Ingredient, IngredientPair, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.nutrition import total_nutrition
+from recipes.shopping import shopping_list
+from recipes.similarity import lsh_index
+from recipes.writebehind import KINDS, apply_pending, toggle_buffer
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, IsAuthenticatedOrReadOnly
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated,
+                                        IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from users.graph import follow_graph
 from users.models import Follow, User
 
-from .filters import IngredientFilter, RecipeFilter
+from .authentication import token_key
+from .catalogue import catalogue_response
+from .coalescing import coalesced
+from .conditional import versioned
+from .documents import read_documents
+from .events import notify
+from .fieldsets import select_fields
+from .filters import IngredientFilter, RecipeFilter, UserFilter
 from .pagintation import CustomPagination
-from .permissions import IsAdminAuthorOrReadOnly, IsAdminOrReadOnly
+from .permissions import IsAdmin, IsAdminAuthorOrReadOnly, IsAdminOrReadOnly
+from .profiling import ProfiledViewMixin
+from .readers import (RECIPE_EMBEDDED, RECIPE_OUTPUT, read_recipes,
+                      recipe_rows, user_flags)
 from .serializers import (CreateRecipesSerializer, FollowSerializer,
-                          IngredientsSerializer, RecipesSerializer,
-                          ShortInfoRecipesSerializer, TagSerializer,
-                          UsersSerializer)
+                          IngredientPairSerializer, IngredientsSerializer,
+                          RecipesSerializer, ShortInfoRecipesSerializer,
+                          TagSerializer, UsersSerializer)
+from .streaming import stream_json_list
 
+# Таблицы, от которых зависят ответы о рецептах для анонима.
+DOCUMENT_TABLES = ('recipes', 'tags', 'ingredients', 'users', 'nutrition')
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class CatalogueMixin:
+    """
+    Без фильтров отдаёт готовый снимок справочника вместо запроса к базе.
+    """
+    catalogue = None
+
+    def list(self, request, *args, **kwargs):
+        if (
+            not request.query_params
+            and request.accepted_renderer.format == 'json'
+        ):
+            response = catalogue_response(self.catalogue, request)
+            if response is not None:
+                return response
+        return super().list(request, *args, **kwargs)
+
+
+@versioned('tags', name='list')
+@versioned('tags', name='retrieve')
+class TagViewSet(ProfiledViewMixin, CatalogueMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    catalogue = 'tags'
     pagination_class = None
     permission_classes = (IsAdminOrReadOnly,)
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+@versioned('ingredients', name='list')
+@versioned('ingredients', name='retrieve')
+@versioned('ingredients', 'pairs', name='pairs')
+class IngredientsViewSet(ProfiledViewMixin, CatalogueMixin,
+                         viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientsSerializer
+    catalogue = 'ingredients'
     filter_backend = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     pagination_class = None
     permission_classes = (IsAdminOrReadOnly,)
 
+    @action(['GET'], detail=True)
+    def pairs(self, request, pk):
+        """
+        Ингредиенты, чаще всего встречающиеся в рецептах вместе с данным;
+        таблицу пересчитывает build_pairs.
+        """
+        ingredient = get_object_or_404(Ingredient, pk=pk)
+        pairs = IngredientPair.objects.filter(
+            ingredient=ingredient
+        ).select_related('pair').order_by('-score', 'pair_id')
+        return Response(IngredientPairSerializer(pairs, many=True).data)
+
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ProfiledViewMixin, UserViewSet):
     queryset = User.objects.all()
     serializer_class = UsersSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = CustomPagination
+    count_versions = ('users', 'follows')
+    throttle_scope = 'users'
+    filterset_class = UserFilter
+
+    @action(['GET', 'PUT', 'PATCH', 'DELETE'], detail=False)
+    def me(self, request, *args, **kwargs):
+        """
+        GET отдаётся из кэша по токену, пока не изменились пользователи
+        и токены.
+        """
+        if request.method != 'GET' or request.auth is None:
+            return super().me(request, *args, **kwargs)
+        key = token_key('me', request.auth)
+        data = cache.get(key)
+        if data is None:
+            data = super().me(request, *args, **kwargs).data
+            cache.set(key, data, settings.ME_CACHE_TIMEOUT)
+        return Response(data)
 
     @action(detail=False)
     def subscriptions(self, request):
@@ -52,6 +130,23 @@ class CustomUserViewSet(UserViewSet):
             context={'request': request})
         return self.get_paginated_response(serializer.data)
 
+    @action(['GET'], detail=False, permission_classes=(IsAuthenticated,))
+    def suggestions(self, request):
+        """
+        Авторы, на которых подписаны авторы из подписок пользователя.
+        """
+        limit = request.query_params.get('limit', '')
+        limit = min(
+            int(limit) if limit.isdigit() else settings.FOLLOW_SUGGESTIONS,
+            settings.MAX_PAGE_SIZE
+        )
+        ids = follow_graph.suggestions(request.user.id, limit)
+        users = User.objects.in_bulk(ids)
+        return Response(UsersSerializer(
+            [users[pk] for pk in ids if pk in users],
+            many=True, context={'request': request}
+        ).data)
+
     @action(methods=['POST', 'DELETE'],
             detail=True, )
     def subscribe(self, request, id):
@@ -69,42 +164,130 @@ class CustomUserViewSet(UserViewSet):
                                 status=status.HTTP_400_BAD_REQUEST)
             serializer = FollowSerializer(author, context={'request': request})
             Follow.objects.create(user=user, author=author)
+            notify(user.id, 'subscription', author=author.id, subscribed=True)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         elif request.method == 'DELETE':
             if subscription.exists():
                 subscription.delete()
+                notify(
+                    user.id, 'subscription', author=author.id, subscribed=False
+                )
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response({'error': 'Вы не подписаны на этого пользователя'},
                             status=status.HTTP_400_BAD_REQUEST)
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
+class RecipesViewSet(ProfiledViewMixin, viewsets.ModelViewSet):
     """
     Вью для рецептов.
     """
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.select_related('author').prefetch_related(
+        Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredients'
+            ).order_by('id')
+        )
+    )
     serializer_class = RecipesSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAdminAuthorOrReadOnly,)
     pagination_class = CustomPagination
+    count_versions = ('recipes', 'tags', 'favorites', 'carts')
+    throttle_scope = 'recipes'
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipesSerializer
         return CreateRecipesSerializer
 
+    @coalesced(*DOCUMENT_TABLES)
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = select_fields(request, RECIPE_OUTPUT, RECIPE_EMBEDDED)
+        if request.user.is_anonymous:
+            rows = queryset.prefetch_related(None).values_list(
+                'id', flat=True
+            )
+            read = read_documents
+        else:
+            rows, read = recipe_rows(queryset, fields), read_recipes
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(read(page, request, fields))
+        return Response(read(rows, request, fields))
+
+    @versioned('recipes', 'tags', 'ingredients', 'users', 'favorites',
+               'carts', 'follows', 'nutrition', per_user=True)
+    @coalesced(*DOCUMENT_TABLES)
+    def retrieve(self, request, *args, **kwargs):
+        if not kwargs['pk'].isdigit():
+            raise Http404
+        fields = select_fields(request, RECIPE_OUTPUT, RECIPE_EMBEDDED)
+        if request.user.is_anonymous:
+            data = read_documents((int(kwargs['pk']),), request, fields)
+        else:
+            data = read_recipes(
+                recipe_rows(self.filter_queryset(
+                    self.get_queryset()
+                ).filter(pk=kwargs['pk']), fields),
+                request, fields
+            )
+        if not data:
+            raise Http404
+        return Response(data[0])
+
+    @action(['GET'], detail=False, permission_classes=(IsAdmin,))
+    def stream(self, request):
+        """
+        Все рецепты по фильтрам одним потоковым JSON-массивом без
+        пагинации для выгрузок.
+        """
+        fields = select_fields(request, RECIPE_OUTPUT, RECIPE_EMBEDDED)
+        return stream_json_list(
+            recipe_rows(self.filter_queryset(self.get_queryset()), fields),
+            lambda batch: read_recipes(batch, request, fields)
+        )
+
+    @action(['GET'], detail=True)
+    @coalesced(*DOCUMENT_TABLES, 'signatures')
+    def similar(self, request, pk):
+        """
+        Рецепты с похожим набором ингредиентов и тегов по LSH-индексу.
+        """
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        limit = request.query_params.get('limit', '')
+        limit = min(
+            int(limit) if limit.isdigit() else settings.SIMILAR_RECIPES,
+            settings.MAX_PAGE_SIZE
+        )
+        ids = lsh_index.similar(recipe.id, limit)
+        fields = select_fields(request, RECIPE_OUTPUT, RECIPE_EMBEDDED)
+        if request.user.is_anonymous:
+            return Response(read_documents(ids, request, fields))
+        position = {pk: i for i, pk in enumerate(ids)}
+        data = read_recipes(
+            recipe_rows(Recipe.objects.filter(id__in=ids), fields),
+            request, fields
+        )
+        return Response(sorted(data, key=lambda item: position[item['id']]))
+
     @staticmethod
-    def post_delete_method(request, model, pk):
+    def post_delete_method(request, kind, pk):
         """
         Функция для favorite and shopping_cart.
         """
+        if settings.WRITE_BEHIND:
+            return RecipesViewSet.buffered_toggle(request, kind, pk)
+        model = KINDS[kind][0]
         if request.method == 'POST':
             if model.objects.filter(user=request.user, recipe__id=pk).exists():
                 return Response({'errors': 'Рецепт уже добавлен!'},
                                 status=status.HTTP_400_BAD_REQUEST)
             recipe = get_object_or_404(Recipe, id=pk)
             model.objects.create(user=request.user, recipe=recipe)
+            notify(request.user.id, kind, recipe=recipe.id, added=True)
             serializer = ShortInfoRecipesSerializer(recipe)
             return Response(
                 serializer.data, status=status.HTTP_201_CREATED
@@ -113,15 +296,41 @@ class RecipesViewSet(viewsets.ModelViewSet):
             obj = model.objects.filter(user=request.user, recipe__id=pk)
             if obj.exists():
                 obj.delete()
+                notify(request.user.id, kind, recipe=int(pk), added=False)
                 return Response(status=status.HTTP_204_NO_CONTENT)
             return Response({'errors': 'Рецепт уже удален!'},
                             status=status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    def buffered_toggle(request, kind, pk):
+        """
+        favorite and shopping_cart через буфер: ответ сразу, запись в
+        базу пачкой позже; пользователь видит своё изменение сразу.
+        """
+        recipe = get_object_or_404(Recipe, id=pk)
+        added = recipe.id in user_flags(kind, [recipe.id], request.user)
+        if request.method == 'POST':
+            if added:
+                return Response({'errors': 'Рецепт уже добавлен!'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            toggle_buffer.toggle(kind, request.user.id, recipe.id, True)
+            notify(request.user.id, kind, recipe=recipe.id, added=True)
+            serializer = ShortInfoRecipesSerializer(recipe)
+            return Response(
+                serializer.data, status=status.HTTP_201_CREATED
+            )
+        if not added:
+            return Response({'errors': 'Рецепт уже удален!'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        toggle_buffer.toggle(kind, request.user.id, recipe.id, False)
+        notify(request.user.id, kind, recipe=recipe.id, added=False)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(['POST', 'DELETE'], detail=True)
     def favorite(self, request, pk):
         return self.post_delete_method(
             request=request,
-            model=Favorite,
+            kind='favorite',
             pk=pk
         )
 
@@ -129,26 +338,30 @@ class RecipesViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk):
         return self.post_delete_method(
             request=request,
-            model=ShoppingCart,
+            kind='cart',
             pk=pk
         )
 
     @action(['GET'], detail=False)
     def download_shopping_cart(self, request):
-        shopping_cart = []
-        cart = (
-            RecipeIngredient.objects.filter(
-                recipe__is_shopping_cart__user=request.user.id
-            ).values(
-                "ingredients__name",
-                "ingredients__measurement_unit",
-            ).annotate(total_quantity=Sum("amount"))
+        shopping_cart = [
+            f"{name}: {quantity} {measurement_unit}"
+            for name, quantity, measurement_unit in shopping_list(
+                request.user.id
+            )
+        ]
+        nutrition = total_nutrition(apply_pending(
+            'cart', request.user.id, ShoppingCart.objects.filter(
+                user=request.user.id
+            ).values_list('recipe_id', flat=True)
+        ))
+        shopping_cart.append(
+            f"\nПищевая ценность: {nutrition['calories']} ккал, "
+            f"белки {nutrition['proteins']} г, "
+            f"жиры {nutrition['fats']} г, "
+            f"углеводы {nutrition['carbohydrates']} г"
+            + ("" if nutrition['complete'] else " (неполные данные)")
         )
-        for item in cart:
-            name = item["ingredients__name"]
-            measurement_unit = item["ingredients__measurement_unit"]
-            quantity = item["total_quantity"]
-            shopping_cart.append(f"{name}: {quantity} {measurement_unit}")
         content = "\n".join(shopping_cart)
         content_type = "text/plain,charset=utf8"
         response = HttpResponse(content, content_type=content_type)
@@ -0,0 +1,105 @@
+import importlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+state = {'ready': False, 'imports': {}, 'steps': {}, 'error': None}
+_lock = threading.Lock()
+
+
+def timed(group, name, func):
+    started = time.perf_counter()
+    func()
+    state[group][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def import_modules():
+    """
+    Импортирует STARTUP_MODULES по порядку: время каждого — цена модуля
+    сверх уже загруженных перед ним.
+    """
+    for name in settings.STARTUP_MODULES:
+        timed('imports', name, lambda: importlib.import_module(name))
+
+
+def warm_serializers():
+    """
+    Строит поля сериализаторов: заполняет кэши _meta моделей и лениво
+    импортируемые модули DRF до первого запроса.
+    """
+    from . import serializers
+
+    for serializer in (
+        serializers.RecipesSerializer, serializers.CreateRecipesSerializer,
+        serializers.ShortInfoRecipesSerializer, serializers.UsersSerializer,
+        serializers.FollowSerializer, serializers.TagSerializer,
+        serializers.IngredientsSerializer,
+        serializers.IngredientPairSerializer,
+    ):
+        serializer().fields
+
+
+def warm_reference_data():
+    from recipes.shopping import unit_map
+    from recipes.similarity import lsh_index
+    from users.graph import follow_graph
+
+    from .catalogue import CATALOGUES, build_catalogue, read_manifest
+    from .prefetch import tag_map
+
+    tag_map.get()
+    unit_map.get()
+    follow_graph.refresh()
+    lsh_index.refresh()
+    manifest = read_manifest()
+    for name in CATALOGUES:
+        if name not in manifest:
+            build_catalogue(name)
+
+
+def warm_up():
+    """
+    Прогрев процесса до приёма запросов: импорты, URLconf,
+    сериализаторы и справочники в памяти. С gunicorn --preload
+    выполняется один раз в мастере, воркеры получают результат при
+    fork. Соединения с базой закрываются, чтобы не делить их с
+    воркерами.
+    """
+    with _lock:
+        if state['ready']:
+            return True
+        started = time.perf_counter()
+        try:
+            import_modules()
+            timed('steps', 'urls', lambda: get_resolver().url_patterns)
+            timed('steps', 'serializers', warm_serializers)
+            timed('steps', 'reference_data', warm_reference_data)
+        except Exception as error:
+            state['error'] = repr(error)
+            logger.exception('Прогрев не завершён')
+            return False
+        finally:
+            connections.close_all()
+        state['steps']['total'] = round(
+            (time.perf_counter() - started) * 1000, 1
+        )
+        state['error'] = None
+        state['ready'] = True
+        logger.info('Прогрев завершён: %s', state)
+        return True
+
+
+def readiness(request):
+    """
+    200, когда процесс прогрет; до этого 503 и повторная попытка
+    прогрева (например, если база была недоступна при старте).
+    """
+    ready = state['ready'] or warm_up()
+    return JsonResponse(state, status=200 if ready else 503)
@@ -0,0 +1,23 @@
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+
+django.setup(set_prefix=False)
+
+from api.events import events_app, send_error  # noqa: E402
+
+EVENTS_PATH = '/api/events/'
+
+
+async def application(scope, receive, send):
+    """
+    ASGI обслуживает только /api/events/; остальной API работает через
+    WSGI (foodgram.wsgi), где синхронные потоковые ответы и соединения
+    с базой закрываются обработчиком Django.
+    """
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        await events_app(scope, receive, send)
+    elif scope['type'] == 'http':
+        await send_error(send, 404, 'Страница не найдена.')
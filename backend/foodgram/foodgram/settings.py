@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,6 +74,16 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -104,13 +115,24 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+CATALOGUE_ROOT = os.path.join(MEDIA_ROOT, 'catalogue')
+CATALOGUE_URL = MEDIA_URL + 'catalogue/'
+CATALOGUE_REDIRECT = os.getenv('CATALOGUE_REDIRECT', default='') == 'True'
+
+COMPRESSION_MIN_SIZE = 1024
+BROTLI_QUALITY = 5
+
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         # 'rest_framework.authentication.BasicAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -121,8 +143,100 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     "PAGE_SIZE": 6,
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api.throttling.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'recipes.create': '30/hour',
+        'recipes.update': '60/hour',
+        'recipes.partial_update': '60/hour',
+        'recipes.favorite': '60/min',
+        'recipes.shopping_cart': '60/min',
+        'recipes.download_shopping_cart': '10/min',
+        'recipes.stream': '6/min',
+        'users.subscribe': '60/min',
+    },
 }
 
+THROTTLE_BACKEND = os.getenv(
+    'THROTTLE_BACKEND', default='api.throttling.LocalBucketStore'
+)
+THROTTLE_REDIS_URL = os.getenv(
+    'THROTTLE_REDIS_URL', default='redis://redis:6379/0'
+)
+THROTTLE_MAX_KEYS = 100000
+
+MAX_PAGE_SIZE = 100
+COUNT_CACHE_TIMEOUT = 60 * 60
+COUNT_ESTIMATE_THRESHOLD = 100000
+NUTRITION_CACHE_TIMEOUT = 24 * 60 * 60
+SIMILAR_RECIPES = 6
+SIMILARITY_SYNC_SLACK = 60
+
+RANKING_TRENDING_HALF_LIFE = 24 * 60 * 60
+RANKING_POPULAR_HALF_LIFE = 30 * 24 * 60 * 60
+RANKING_WEIGHTS = {'favorites': 1.0, 'carts': 0.5}
+RANKING_LAG = 5
+
+INGREDIENT_PAIRS = 10
+INGREDIENT_PAIRS_MIN_RECIPES = 2
+INGREDIENT_DUPLICATE_SIMILARITY = 0.8
+INGREDIENT_DUPLICATE_MAX_BLOCK = 200
+
+FOLLOW_GRAPH_MAX_DELTAS = 1000
+FOLLOW_GRAPH_DELTA_TIMEOUT = 60 * 60
+FOLLOW_GRAPH_MAX_AGE = 60 * 60
+FOLLOW_SUGGESTIONS = 10
+ME_CACHE_TIMEOUT = 5 * 60
+TOKEN_CACHE_TIMEOUT = 5 * 60
+
+IMAGE_GC_GRACE = 24 * 60 * 60
+
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', default='') == 'True'
+WRITE_BEHIND_DIR = os.getenv(
+    'WRITE_BEHIND_DIR', default=os.path.join(BASE_DIR, 'writebehind')
+)
+WRITE_BEHIND_INTERVAL = 2
+WRITE_BEHIND_MAX_PENDING = 500
+WRITE_BEHIND_FSYNC = True
+WRITE_BEHIND_OVERLAY_TIMEOUT = 10 * 60
+
+EVENTS_BACKEND = os.getenv('EVENTS_BACKEND', default='api.events.LocalBroker')
+EVENTS_REDIS_URL = os.getenv('EVENTS_REDIS_URL', default='redis://redis:6379/0')
+EVENTS_QUEUE_SIZE = 100
+EVENTS_HEARTBEAT = 15
+EVENTS_RETRY = 3000
+
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', default='0'))
+PROFILE_INTERVAL = 0.005
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_SQL_LENGTH = 1000
+PROFILE_KEEP = 1000
+
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', default='True') == 'True'
+STARTUP_MODULES = (
+    'rest_framework.views',
+    'rest_framework.serializers',
+    'django_filters.rest_framework',
+    'djoser.views',
+    'drf_extra_fields.fields',
+    'numpy',
+    'scipy.sparse',
+    'api.views',
+    'api.admin',
+)
+
+STREAM_CHUNK_SIZE = 500
+
+COALESCE_TIMEOUT = 60
+COALESCE_STALE = 5 * 60
+COALESCE_LEASE_TIMEOUT = 30
+COALESCE_WAIT = 0.1
+
+EXPORT_ROOT = os.getenv('EXPORT_ROOT', default=os.path.join(BASE_DIR, 'export'))
+EXPORT_BATCH_SIZE = 50000
+EXPORT_LAG = 10
+
 DJOSER = {
     "LOGIN_FIELD": "email",
     "HIDE_USERS": False,
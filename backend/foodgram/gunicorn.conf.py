@@ -0,0 +1,16 @@
+import os
+
+bind = '0:8000'
+# Версии таблиц, кэш токенов и журналы графа подписок и буфера событий
+# хранятся в кэше Django: больше одного воркера — только с общим кэшем
+# (CACHE_BACKEND), иначе воркеры расходятся.
+workers = int(os.getenv('GUNICORN_WORKERS', default='1'))
+# Приложение и прогрев (foodgram.wsgi → api.warmup) загружаются один раз
+# в мастере, воркеры получают их при fork.
+preload_app = True
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    connections.close_all()
@@ -1,37 +1,118 @@
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
-from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+from .models import (Favorite, Ingredient, IngredientNutrition, Recipe,
+                     RecipeIngredient, ShoppingCart, Tag)
+from .paginator import CountCachingPaginator
+
+
+class CountCachingAdmin(admin.ModelAdmin):
+    """
+    Админка для больших таблиц: число строк берётся из кэша по версиям
+    count_versions или из оценки PostgreSQL, без COUNT(*) всей таблицы.
+    """
+    count_versions = ()
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return CountCachingPaginator(
+            queryset, per_page, versions=self.count_versions,
+            orphans=orphans, allow_empty_first_page=allow_empty_first_page
+        )
 
 
 class TagsAdmin(admin.ModelAdmin):
     list_display = ('name', 'color', 'slug')
+    search_fields = ('name', 'slug')
 
 
-class IngredientsAdmin(admin.ModelAdmin):
+class IngredientsAdmin(CountCachingAdmin):
     list_display = ('name', 'measurement_unit')
+    search_fields = ('^name',)
+    count_versions = ('ingredients',)
+
+
+class IngredientNutritionAdmin(CountCachingAdmin):
+    list_display = (
+        'ingredient', 'calories', 'proteins', 'fats', 'carbohydrates',
+        'unit_weight'
+    )
+    list_select_related = ('ingredient',)
+    autocomplete_fields = ('ingredient',)
+    search_fields = ('^ingredient__name',)
+    count_versions = ('nutrition',)
 
 
-class RecipeIngredientsAdmin(admin.ModelAdmin):
+class RecipeIngredientsAdmin(CountCachingAdmin):
     list_display = ('ingredients', 'recipe', 'amount')
+    list_select_related = ('ingredients', 'recipe')
+    autocomplete_fields = ('ingredients', 'recipe')
+    search_fields = ('^recipe__name', '^ingredients__name')
+    count_versions = ('recipes',)
+
+
+class RecipeIngredientInline(admin.TabularInline):
+    model = RecipeIngredient
+    autocomplete_fields = ('ingredients',)
+    extra = 0
+    min_num = 1
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredients'
+        )
 
-class RecipeAdmin(admin.ModelAdmin):
+
+class RecipeAdmin(CountCachingAdmin):
     list_display = (
-        'id', 'name', 'author'
+        'id', 'name', 'author', 'favorites'
     )
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('^name',)
+    autocomplete_fields = ('author', 'tags')
+    inlines = (RecipeIngredientInline,)
+    count_versions = ('recipes', 'tags')
+
+    def get_queryset(self, request):
+        """
+        Число добавлений в избранное подзапросом только для строк
+        страницы, без GROUP BY по всей таблице рецептов.
+        """
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(total=Count('*'))
+        return super().get_queryset(request).annotate(
+            favorites_total=Coalesce(
+                Subquery(favorites.values('total')), 0,
+                output_field=IntegerField()
+            )
+        )
+
+    @admin.display(description='В избранном', ordering='favorites_total')
+    def favorites(self, obj):
+        return obj.favorites_total
 
 
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(CountCachingAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    count_versions = ('favorites',)
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(CountCachingAdmin):
     list_display = ('recipe', 'user')
+    list_select_related = ('recipe', 'user')
+    autocomplete_fields = ('recipe', 'user')
+    count_versions = ('carts',)
 
 
 admin.site.register(Tag, TagsAdmin)
 admin.site.register(Ingredient, IngredientsAdmin)
+admin.site.register(IngredientNutrition, IngredientNutritionAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientsAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
@@ -0,0 +1,213 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Ingredient, IngredientNutrition, RecipeIngredient
+from .versions import bump_version
+
+WORD = re.compile(r'\w+')
+# Окончания множественного числа, отбрасываемые, если остаётся не меньше
+# четырёх букв: «томаты» и «томат», «огурцов» и «огурц» дают один ключ.
+ENDINGS = ('ов', 'ев', 'ей', 'ы', 'и', 'а', 'я')
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 4:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize(name):
+    """
+    Ключ названия: регистр, ё/е, пробелы и знаки препинания, окончания.
+    """
+    words = WORD.findall(name.lower().replace('ё', 'е'))
+    return ' '.join(stem(word) for word in words)
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Clusters:
+    """
+    Система непересекающихся множеств над id ингредиентов.
+    """
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first, second):
+        self.parent[self.find(first)] = self.find(second)
+
+    def groups(self):
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def similar_keys(keys, threshold, max_block):
+    """
+    Пары индексов ключей с мерой Жаккара по триграммам не ниже
+    threshold. Кандидаты берутся из общих триграмм (блокировка), а
+    триграммы, встречающиеся чаще max_block раз, не используются —
+    сравнений примерно n·max_block, а не n².
+    """
+    grams = [trigrams(key) for key in keys]
+    postings = {}
+    for index, key_grams in enumerate(grams):
+        for gram in key_grams:
+            postings.setdefault(gram, []).append(index)
+    for index, key_grams in enumerate(grams):
+        shared = Counter()
+        for gram in key_grams:
+            block = postings[gram]
+            if len(block) <= max_block:
+                shared.update(other for other in block if other > index)
+        for other, common in shared.items():
+            total = len(key_grams) + len(grams[other]) - common
+            if common / total >= threshold:
+                yield index, other
+
+
+def block_key(key, unit):
+    """
+    Сравниваются только названия с одной единицей измерения (количества
+    разных единиц складывать нельзя), одним числом слов и одними числами:
+    «шоколад 70%» и «шоколад 85%», «ароматизатор» и «ароматизатор ром» —
+    разные продукты, а не опечатки.
+    """
+    words = key.split()
+    return (
+        normalize(unit), len(words),
+        tuple(word for word in words if word.isdigit())
+    )
+
+
+def find_duplicates(threshold=None, max_block=None):
+    """
+    Группы id ингредиентов-дубликатов: с одинаковым ключом normalize или
+    похожими триграммами внутри блока block_key.
+    """
+    threshold = threshold or settings.INGREDIENT_DUPLICATE_SIMILARITY
+    max_block = max_block or settings.INGREDIENT_DUPLICATE_MAX_BLOCK
+    blocks = {}
+    for ingredient_id, name, unit in Ingredient.objects.order_by(
+        'id'
+    ).values_list('id', 'name', 'measurement_unit').iterator():
+        key = normalize(name)
+        keys = blocks.setdefault(block_key(key, unit), {})
+        keys.setdefault(key, []).append(ingredient_id)
+    clusters = Clusters()
+    for keys in blocks.values():
+        ids = list(keys.values())
+        for same in ids:
+            for ingredient_id in same:
+                clusters.union(ingredient_id, same[0])
+        for first, second in similar_keys(list(keys), threshold, max_block):
+            clusters.union(ids[first][0], ids[second][0])
+    return clusters.groups()
+
+
+def plan_merges(groups):
+    """
+    {основной id: [id дубликатов]}. Основным становится ингредиент из
+    наибольшего числа рецептов, при равенстве — с меньшим id.
+    """
+    ids = [ingredient_id for group in groups for ingredient_id in group]
+    usage = dict(RecipeIngredient.objects.filter(
+        ingredients__in=ids
+    ).order_by().values('ingredients').annotate(
+        total=Count('*')
+    ).values_list('ingredients', 'total'))
+    plan = {}
+    for group in groups:
+        target = min(group, key=lambda item: (-usage.get(item, 0), item))
+        plan[target] = [item for item in group if item != target]
+    return plan
+
+
+def merge_rows(plan):
+    """
+    Переносит строки RecipeIngredient дубликатов на основной
+    ингредиент. Строки одного рецепта складываются в одну с суммой
+    количеств, чтобы не нарушить unique_ingredients_recipe.
+    """
+    mapping = {
+        duplicate: target
+        for target, duplicates in plan.items() for duplicate in duplicates
+    }
+    merged = {}
+    rows = RecipeIngredient.objects.filter(
+        ingredients__in=[*mapping, *plan]
+    ).order_by('id').only('id', 'recipe_id', 'ingredients_id', 'amount')
+    for row in rows.iterator():
+        target = mapping.get(row.ingredients_id, row.ingredients_id)
+        merged.setdefault((row.recipe_id, target), []).append(row)
+    kept, removed = [], []
+    for (_, target), group in merged.items():
+        if len(group) == 1 and group[0].ingredients_id == target:
+            continue
+        keep = next(
+            (row for row in group if row.ingredients_id == target), group[0]
+        )
+        keep.amount = sum(row.amount for row in group)
+        keep.ingredients_id = target
+        kept.append(keep)
+        removed.extend(row.id for row in group if row is not keep)
+    RecipeIngredient.objects.filter(id__in=removed).delete()
+    RecipeIngredient.objects.bulk_update(
+        kept, ('ingredients', 'amount'), batch_size=1000
+    )
+    return {row.recipe_id for row in kept}
+
+
+def merge_nutrition(plan):
+    """
+    Основной ингредиент без пищевой ценности получает её от дубликата.
+    """
+    known = set(IngredientNutrition.objects.filter(
+        ingredient__in=[*plan, *(
+            duplicate for duplicates in plan.values()
+            for duplicate in duplicates
+        )]
+    ).values_list('ingredient_id', flat=True))
+    copies = []
+    for target, duplicates in plan.items():
+        source = next((item for item in duplicates if item in known), None)
+        if target in known or source is None:
+            continue
+        nutrition = IngredientNutrition.objects.get(ingredient_id=source)
+        nutrition.ingredient_id = target
+        copies.append(nutrition)
+    IngredientNutrition.objects.bulk_create(copies)
+
+
+@transaction.atomic
+def merge_duplicates(plan):
+    """
+    Сливает дубликаты по плану plan_merges и удаляет их. Возвращает id
+    рецептов, у которых изменился состав.
+    """
+    changed = merge_rows(plan)
+    merge_nutrition(plan)
+    Ingredient.objects.filter(id__in=[
+        duplicate for duplicates in plan.values() for duplicate in duplicates
+    ]).delete()
+    if changed:
+        bump_version('recipes')
+    bump_version('nutrition')
+    return changed
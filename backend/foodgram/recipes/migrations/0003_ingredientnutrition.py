@@ -0,0 +1,30 @@
+# Generated by Django 3.2.15 on 2026-10-19 19:01
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_recipedocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientNutrition',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='nutrition', serialize=False, to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('calories', models.FloatField(default=0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Калории, ккал')),
+                ('proteins', models.FloatField(default=0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Белки, г')),
+                ('fats', models.FloatField(default=0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Жиры, г')),
+                ('carbohydrates', models.FloatField(default=0, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Углеводы, г')),
+                ('unit_weight', models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Вес единицы измерения, г')),
+            ],
+            options={
+                'verbose_name': 'Пищевая ценность',
+                'verbose_name_plural': 'Пищевая ценность',
+            },
+        ),
+    ]
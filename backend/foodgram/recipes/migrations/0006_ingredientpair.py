@@ -0,0 +1,33 @@
+# Generated by Django 3.2.15 on 2026-10-19 19:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_rankings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipes', models.PositiveIntegerField(verbose_name='Общих рецептов')),
+                ('score', models.FloatField(verbose_name='Сходство')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pairs', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('pair', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.ingredient', verbose_name='Сочетается с')),
+            ],
+            options={
+                'verbose_name': 'Сочетание ингредиентов',
+                'verbose_name_plural': 'Сочетания ингредиентов',
+                'ordering': ('ingredient', '-score'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientpair',
+            constraint=models.UniqueConstraint(fields=('ingredient', 'pair'), name='unique_ingredient_pair'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.15 on 2026-10-19 19:13
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_ingredientpair'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/images', verbose_name='Картинка'),
+        ),
+    ]
@@ -2,6 +2,9 @@ from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
+
+from .storage import image_storage
 
 User = get_user_model()
 
@@ -71,6 +74,7 @@ class Recipe(models.Model):
     pub_date = models.DateField('Дата публикации', auto_now_add=True)
     image = models.ImageField(
         upload_to='recipes/images',
+        storage=image_storage,
         verbose_name='Картинка'
     )
     name = models.CharField(
@@ -157,6 +161,10 @@ class ShoppingCart(models.Model):
         User,
         on_delete=models.CASCADE
     )
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Добавлен'
+    )
 
     class Meta:
         verbose_name = 'Рецепт в корзине'
@@ -182,6 +190,10 @@ class Favorite(models.Model):
         User,
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Добавлен'
+    )
 
     class Meta:
         ordering = ('user',)
@@ -193,3 +205,160 @@ class Favorite(models.Model):
                 name='unique_favorite',
             ),
         )
+
+
+class RecipeDocument(models.Model):
+    """
+    Готовое публичное представление рецепта, пересобирается при записи.
+    Хранится текстом: jsonb в PostgreSQL не сохраняет порядок ключей.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document',
+        verbose_name='Рецепт'
+    )
+    data = models.TextField(verbose_name='Документ')
+    updated = models.DateTimeField(auto_now=True, verbose_name='Обновлён')
+
+    class Meta:
+        verbose_name = 'Документ рецепта'
+        verbose_name_plural = 'Документы рецептов'
+
+
+class IngredientNutrition(models.Model):
+    """
+    Пищевая ценность ингредиента на 100 г.
+    """
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='nutrition',
+        verbose_name='Ингредиент'
+    )
+    calories = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name='Калории, ккал'
+    )
+    proteins = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name='Белки, г'
+    )
+    fats = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name='Жиры, г'
+    )
+    carbohydrates = models.FloatField(
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name='Углеводы, г'
+    )
+    unit_weight = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name='Вес единицы измерения, г'
+    )
+
+    class Meta:
+        verbose_name = 'Пищевая ценность'
+        verbose_name_plural = 'Пищевая ценность'
+
+    def __str__(self):
+        return f'{self.ingredient}: {self.calories} ккал'
+
+
+class RecipeSignature(models.Model):
+    """
+    MinHash-подпись набора ингредиентов и тегов рецепта.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Рецепт'
+    )
+    minhash = models.BinaryField(verbose_name='Подпись')
+    updated = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Обновлена'
+    )
+
+    class Meta:
+        verbose_name = 'Подпись рецепта'
+        verbose_name_plural = 'Подписи рецептов'
+
+
+class RecipeRanking(models.Model):
+    """
+    Рейтинги рецепта по добавлениям в избранное и список покупок.
+    Хранится логарифм суммы exp((t - t0) / τ) по событиям: порядок по
+    нему совпадает с порядком по затухающей сумме в любой момент.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт'
+    )
+    trending = models.FloatField(db_index=True, verbose_name='Тренд')
+    popular = models.FloatField(db_index=True, verbose_name='Популярность')
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+
+
+class RankingCursor(models.Model):
+    """
+    Последнее обработанное событие источника для пересчёта рейтингов.
+    """
+    source = models.CharField(
+        max_length=50,
+        primary_key=True,
+        verbose_name='Источник'
+    )
+    last_id = models.BigIntegerField(default=0, verbose_name='Последний id')
+
+    class Meta:
+        verbose_name = 'Позиция пересчёта рейтингов'
+        verbose_name_plural = 'Позиции пересчёта рейтингов'
+
+
+class IngredientPair(models.Model):
+    """
+    Ингредиент, чаще других встречающийся в рецептах вместе с данным.
+    """
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='pairs',
+        verbose_name='Ингредиент'
+    )
+    pair = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Сочетается с'
+    )
+    recipes = models.PositiveIntegerField(verbose_name='Общих рецептов')
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        ordering = ('ingredient', '-score')
+        verbose_name = 'Сочетание ингредиентов'
+        verbose_name_plural = 'Сочетания ингредиентов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('ingredient', 'pair'),
+                name='unique_ingredient_pair',
+            ),
+        )
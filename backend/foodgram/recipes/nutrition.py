@@ -0,0 +1,102 @@
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import IngredientNutrition, RecipeIngredient
+from .units import grams_per_unit
+from .versions import get_version
+
+NUTRIENTS = ('calories', 'proteins', 'fats', 'carbohydrates')
+NUTRITION_KEY = 'nutrition:{}:{}'
+
+
+def as_dict(totals, complete):
+    result = {
+        name: round(float(value), 1)
+        for name, value in zip(NUTRIENTS, totals)
+    }
+    result['complete'] = bool(complete)
+    return result
+
+
+def compute_nutrition(recipe_ids):
+    """
+    Пищевая ценность рецептов одним матричным произведением:
+    (рецепты × ингредиенты, граммы) @ (ингредиенты × нутриенты на 1 г).
+    """
+    recipe_ids = list(recipe_ids)
+    rows = list(RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list(
+        'recipe_id', 'ingredients_id', 'ingredients__measurement_unit',
+        'amount'
+    ))
+    ingredient_ids = sorted({row[1] for row in rows})
+    recipe_index = {pk: i for i, pk in enumerate(recipe_ids)}
+    ingredient_index = {pk: i for i, pk in enumerate(ingredient_ids)}
+
+    facts = np.zeros((len(ingredient_ids), len(NUTRIENTS)))
+    unit_weights = {}
+    known = np.zeros(len(ingredient_ids), dtype=bool)
+    for item in IngredientNutrition.objects.filter(
+        ingredient_id__in=ingredient_ids
+    ).values('ingredient_id', 'unit_weight', *NUTRIENTS):
+        i = ingredient_index[item['ingredient_id']]
+        facts[i] = [item[name] / 100 for name in NUTRIENTS]
+        unit_weights[item['ingredient_id']] = item['unit_weight']
+        known[i] = True
+
+    grams = np.zeros((len(recipe_ids), len(ingredient_ids)))
+    complete = np.ones(len(recipe_ids), dtype=bool)
+    for recipe_id, ingredient_id, unit, amount in rows:
+        i, j = recipe_index[recipe_id], ingredient_index[ingredient_id]
+        weight = grams_per_unit(unit, unit_weights.get(ingredient_id))
+        if weight is None or not known[j]:
+            complete[i] = False
+            continue
+        grams[i, j] += amount * weight
+    totals = grams @ facts
+    return {
+        pk: as_dict(totals[i], complete[i])
+        for pk, i in recipe_index.items()
+    }
+
+
+def recipe_nutrition(recipe_ids):
+    """
+    Пищевая ценность рецептов из кэша, недостающие считаются пачкой.
+    """
+    recipe_ids = list(recipe_ids)
+    version = get_version('nutrition')
+    keys = {NUTRITION_KEY.format(pk, version): pk for pk in recipe_ids}
+    result = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [pk for pk in recipe_ids if pk not in result]
+    if missing:
+        computed = compute_nutrition(missing)
+        cache.set_many(
+            {
+                NUTRITION_KEY.format(pk, version): value
+                for pk, value in computed.items()
+            },
+            settings.NUTRITION_CACHE_TIMEOUT
+        )
+        result.update(computed)
+    return result
+
+
+def forget_nutrition(recipe_ids):
+    version = get_version('nutrition')
+    cache.delete_many(
+        [NUTRITION_KEY.format(pk, version) for pk in recipe_ids]
+    )
+
+
+def total_nutrition(recipe_ids):
+    """
+    Сумма пищевой ценности набора рецептов, например списка покупок.
+    """
+    values = list(recipe_nutrition(recipe_ids).values())
+    totals = np.array(
+        [[item[name] for name in NUTRIENTS] for item in values]
+    ).reshape(-1, len(NUTRIENTS)).sum(axis=0)
+    return as_dict(totals, all(item['complete'] for item in values))
@@ -0,0 +1,70 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from .versions import get_versions
+
+COUNT_KEY = 'count:{}'
+
+
+def estimated_count(queryset):
+    """
+    Оценка числа строк таблицы по статистике планировщика PostgreSQL
+    для выборок без условий; None, если оценка не применима.
+    """
+    connection = connections[queryset.db]
+    if (
+        connection.vendor != 'postgresql'
+        or not settings.COUNT_ESTIMATE_THRESHOLD
+        or queryset.query.where
+    ):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < settings.COUNT_ESTIMATE_THRESHOLD:
+        return None
+    return int(row[0])
+
+
+class CountCachingPaginator(Paginator):
+    """
+    Paginator, который берёт COUNT(*) из кэша по SQL выборки и версиям
+    таблиц, а для больших таблиц без фильтров — из оценки PostgreSQL.
+    """
+
+    def __init__(self, object_list, per_page, versions=(), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.versions = versions
+        self.count_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not self.versions or not isinstance(queryset, QuerySet):
+            return super().count
+        estimate = estimated_count(queryset)
+        if estimate is not None:
+            self.count_exact = False
+            return estimate
+        try:
+            sql = str(queryset.query)
+        except EmptyResultSet:
+            return 0
+        key = COUNT_KEY.format(md5(
+            repr([sql, *get_versions(*self.versions)]).encode()
+        ).hexdigest())
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+        return count
@@ -0,0 +1,85 @@
+from itertools import chain, islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import IngredientPair, RecipeIngredient
+from .versions import bump_version
+
+
+def incidence_matrix(chunk_size=100000):
+    """
+    Разреженная матрица рецепты × ингредиенты из всех строк
+    RecipeIngredient без создания моделей и промежуточных списков.
+    """
+    rows = RecipeIngredient.objects.order_by().values_list(
+        'recipe_id', 'ingredients_id'
+    ).iterator(chunk_size=chunk_size)
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64)
+    recipe_ids, ingredient_ids = pairs[0::2], pairs[1::2]
+    recipes, recipe_index = np.unique(recipe_ids, return_inverse=True)
+    ingredients, ingredient_index = np.unique(
+        ingredient_ids, return_inverse=True
+    )
+    matrix = sparse.csr_matrix(
+        (np.ones(len(pairs) // 2, dtype=np.int32),
+         (recipe_index, ingredient_index)),
+        shape=(len(recipes), len(ingredients))
+    )
+    matrix.data[:] = 1
+    return matrix, ingredients
+
+
+def top_pairs(matrix, limit, min_recipes):
+    """
+    Для каждого ингредиента limit соседей по косинусной мере
+    совместной встречаемости: общих рецептов / √(рецептов₁ · рецептов₂).
+    """
+    counts = (matrix.T @ matrix).tocsr()
+    counts.setdiag(0)
+    counts.data[counts.data < min_recipes] = 0
+    counts.eliminate_zeros()
+    totals = np.sqrt(np.asarray(matrix.sum(axis=0)).ravel())
+    for i in range(counts.shape[0]):
+        start, end = counts.indptr[i], counts.indptr[i + 1]
+        if start == end:
+            continue
+        columns = counts.indices[start:end]
+        together = counts.data[start:end]
+        scores = together / (totals[i] * totals[columns])
+        best = np.argsort(-scores, kind='stable')[:limit]
+        yield i, columns[best], together[best], scores[best]
+
+
+def build_pairs(limit=None, min_recipes=None, batch_size=10000):
+    """
+    Пересчитывает таблицу сочетаний ингредиентов целиком.
+    """
+    limit = limit or settings.INGREDIENT_PAIRS
+    min_recipes = min_recipes or settings.INGREDIENT_PAIRS_MIN_RECIPES
+    matrix, ingredients = incidence_matrix()
+    objects = (
+        IngredientPair(
+            ingredient_id=int(ingredients[i]),
+            pair_id=int(ingredients[j]),
+            recipes=int(together),
+            score=round(float(score), 4)
+        )
+        for i, columns, counts, scores in top_pairs(
+            matrix, limit, min_recipes
+        )
+        for j, together, score in zip(columns, counts, scores)
+    )
+    created = 0
+    with transaction.atomic():
+        IngredientPair.objects.all().delete()
+        while True:
+            batch = list(islice(objects, batch_size))
+            if not batch:
+                break
+            IngredientPair.objects.bulk_create(batch)
+            created += len(batch)
+        bump_version('pairs')
+    return created
@@ -0,0 +1,104 @@
+import math
+from datetime import datetime, timedelta
+from itertools import takewhile
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Favorite, RankingCursor, RecipeRanking, ShoppingCart
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+SOURCES = {'favorites': Favorite, 'carts': ShoppingCart}
+RANKINGS = ('trending', 'popular')
+
+
+def half_lives():
+    return {
+        'trending': settings.RANKING_TRENDING_HALF_LIFE,
+        'popular': settings.RANKING_POPULAR_HALF_LIFE,
+    }
+
+
+def event_scores(recipe_ids, moments, weights):
+    """
+    Логарифмы затухающих сумм событий по рецептам:
+    log Σ w·2^((t - t0) / half_life) для каждого рейтинга.
+    """
+    recipes, index = np.unique(recipe_ids, return_inverse=True)
+    seconds = np.array(
+        [(moment - EPOCH).total_seconds() for moment in moments]
+    )
+    scores = {}
+    for name, half_life in half_lives().items():
+        values = seconds * math.log(2) / half_life + np.log(weights)
+        totals = np.full(len(recipes), -np.inf)
+        np.logaddexp.at(totals, index, values)
+        scores[name] = totals
+    return recipes, scores
+
+
+def update_rankings(batch_size=5000):
+    """
+    Дописывает в рейтинги события, добавленные с прошлого запуска.
+    Строки идут по id; пачка обрывается на первой строке новее
+    RANKING_LAG, и позиция остаётся перед ней. Так не теряются ни
+    строки незавершённых транзакций, ни строки буфера событий, у которых
+    created задним числом и порядок created не совпадает с порядком id.
+    """
+    processed = 0
+    until = timezone.now() - timedelta(seconds=settings.RANKING_LAG)
+    for source, model in SOURCES.items():
+        weight = settings.RANKING_WEIGHTS[source]
+        complete = False
+        while not complete:
+            with transaction.atomic():
+                cursor, _ = RankingCursor.objects.select_for_update(
+                ).get_or_create(source=source)
+                rows = list(model.objects.filter(
+                    id__gt=cursor.last_id
+                ).order_by('id').values_list(
+                    'id', 'recipe_id', 'created'
+                )[:batch_size])
+                ready = list(takewhile(lambda row: row[2] <= until, rows))
+                complete = len(ready) < batch_size
+                if not ready:
+                    break
+                ids, recipe_ids, moments = zip(*ready)
+                apply_scores(*event_scores(
+                    recipe_ids, moments, np.full(len(ready), weight)
+                ))
+                cursor.last_id = ids[-1]
+                cursor.save(update_fields=['last_id'])
+            processed += len(ready)
+    return processed
+
+
+def apply_scores(recipes, scores):
+    recipes = [int(pk) for pk in recipes]
+    existing = RecipeRanking.objects.select_for_update().in_bulk(recipes)
+    created, updated = [], []
+    for i, pk in enumerate(recipes):
+        ranking = existing.get(pk)
+        if ranking is None:
+            created.append(RecipeRanking(recipe_id=pk, **{
+                name: float(scores[name][i]) for name in RANKINGS
+            }))
+            continue
+        for name in RANKINGS:
+            setattr(ranking, name, float(
+                np.logaddexp(getattr(ranking, name), scores[name][i])
+            ))
+        updated.append(ranking)
+    RecipeRanking.objects.bulk_create(created)
+    RecipeRanking.objects.bulk_update(updated, RANKINGS)
+
+
+def reset_rankings():
+    """
+    Сбрасывает рейтинги и позиции, следующий запуск пересчитает всё.
+    """
+    with transaction.atomic():
+        RecipeRanking.objects.all().delete()
+        RankingCursor.objects.all().delete()
@@ -0,0 +1,102 @@
+from django.db.models import (Case, CharField, F, FloatField, Min, Sum, Value,
+                              When)
+from django.db.models.functions import Lower, Replace
+
+from .models import Ingredient, RecipeIngredient
+from .units import GRAM, MILLILITRE, normalize_unit
+from .versions import get_version
+from .writebehind import recipe_filter
+
+# Базовая единица → (крупная единица, сколько в ней базовых).
+LARGER_UNITS = {GRAM: ('кг', 1000), MILLILITRE: ('л', 1000)}
+
+
+class UnitMap:
+    """
+    Встречающиеся в каталоге единицы измерения с базовой единицей и
+    множителем, сверяемые с версией таблицы ингредиентов.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.units = {}
+
+    def get(self):
+        version = get_version('ingredients')
+        if version != self.version:
+            self.units = {
+                unit: normalize_unit(unit)
+                for unit in Ingredient.objects.order_by().values_list(
+                    'measurement_unit', flat=True
+                ).distinct()
+            }
+            self.version = version
+        return self.units
+
+
+unit_map = UnitMap()
+
+
+def normalize_name(name):
+    return name.lower().replace('ё', 'е').strip()
+
+
+def format_quantity(total, unit):
+    """
+    Количество в удобном виде: 1500 г → 1.5 кг, 2.0 шт. → 2 шт.
+    """
+    larger, factor = LARGER_UNITS.get(unit, (None, None))
+    if larger and total >= factor:
+        total, unit = total / factor, larger
+    total = round(total, 2)
+    if total == int(total):
+        total = int(total)
+    return total, unit
+
+
+def shopping_list(user):
+    """
+    Список покупок пользователя одним агрегирующим запросом: количества
+    приводятся к базовым единицам и суммируются в базе по названию без
+    учёта регистра и ё.
+    """
+    units = unit_map.get()
+    factor = Case(
+        *[
+            When(ingredients__measurement_unit=unit, then=Value(factor))
+            for unit, (base, factor) in units.items() if factor != 1
+        ],
+        default=Value(1.0),
+        output_field=FloatField()
+    )
+    base_unit = Case(
+        *[
+            When(ingredients__measurement_unit=unit, then=Value(base))
+            for unit, (base, factor) in units.items() if base != unit
+        ],
+        default=F('ingredients__measurement_unit'),
+        output_field=CharField()
+    )
+    rows = RecipeIngredient.objects.filter(
+        recipe_filter('cart', user, 'recipe__')
+    ).annotate(
+        product=Replace(
+            Lower('ingredients__name'), Value('ё'), Value('е')
+        ),
+        unit=base_unit,
+    ).values('product', 'unit').annotate(
+        name=Min('ingredients__name'),
+        total=Sum(F('amount') * factor, output_field=FloatField()),
+    ).order_by('product', 'unit')
+
+    merged = {}
+    for row in rows:
+        key = (normalize_name(row['product']), row['unit'])
+        if key in merged:
+            merged[key]['total'] += row['total']
+        else:
+            merged[key] = row
+    return [
+        (row['name'], *format_quantity(row['total'], row['unit']))
+        for row in merged.values()
+    ]
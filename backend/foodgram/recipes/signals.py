@@ -0,0 +1,38 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (Favorite, Ingredient, IngredientNutrition, Recipe,
+                     RecipeIngredient, ShoppingCart, Tag)
+from .versions import bump_version
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    bump_version('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    bump_version('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_changed(**kwargs):
+    bump_version('recipes')
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_changed(**kwargs):
+    bump_version('favorites')
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(**kwargs):
+    bump_version('carts')
+
+
+@receiver((post_save, post_delete), sender=IngredientNutrition)
+def nutrition_changed(**kwargs):
+    bump_version('nutrition')
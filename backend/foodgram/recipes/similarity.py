@@ -0,0 +1,147 @@
+import threading
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Recipe, RecipeIngredient, RecipeSignature
+from .versions import bump_version, get_version
+
+PERMUTATIONS = 64
+BANDS = 16
+ROWS = PERMUTATIONS // BANDS
+PRIME = (1 << 31) - 1
+
+_random = np.random.RandomState(20230101)
+COEFFICIENTS = _random.randint(1, PRIME, size=PERMUTATIONS, dtype=np.uint64)
+OFFSETS = _random.randint(0, PRIME, size=PERMUTATIONS, dtype=np.uint64)
+
+
+def recipe_tokens(recipe_ids):
+    """
+    Ингредиенты и теги рецептов двумя запросами.
+    """
+    tokens = {pk: set() for pk in recipe_ids}
+    for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+        recipe_id__in=tokens
+    ).values_list('recipe_id', 'ingredients_id'):
+        tokens[recipe_id].add(f'i{ingredient_id}')
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+        recipe_id__in=tokens
+    ).values_list('recipe_id', 'tag_id'):
+        tokens[recipe_id].add(f't{tag_id}')
+    return tokens
+
+
+def minhash(tokens):
+    """
+    MinHash-подпись множества: минимум (a·x + b) mod p по элементам
+    для каждой из PERMUTATIONS хеш-функций.
+    """
+    if not tokens:
+        return np.full(PERMUTATIONS, PRIME, dtype=np.uint32)
+    hashes = np.array(
+        [zlib.crc32(token.encode()) for token in tokens], dtype=np.uint64
+    )
+    values = (np.outer(hashes, COEFFICIENTS) + OFFSETS) % PRIME
+    return values.min(axis=0).astype(np.uint32)
+
+
+def band_keys(signature):
+    return [
+        (band, signature[band * ROWS:(band + 1) * ROWS].tobytes())
+        for band in range(BANDS)
+    ]
+
+
+def update_signatures(recipe_ids):
+    """
+    Пересчитывает подписи рецептов; индексы воркеров подхватят их по
+    полю updated.
+    """
+    tokens = recipe_tokens(recipe_ids)
+    existing = set(Recipe.objects.filter(
+        id__in=tokens
+    ).values_list('id', flat=True))
+    RecipeSignature.objects.filter(recipe_id__in=tokens).delete()
+    RecipeSignature.objects.bulk_create([
+        RecipeSignature(recipe_id=pk, minhash=minhash(items).tobytes())
+        for pk, items in tokens.items() if pk in existing
+    ])
+    bump_version('signatures')
+
+
+class LSHIndex:
+    """
+    LSH-индекс подписей в памяти воркера. При смене версии таблицы
+    подписей догружает только строки, изменённые с прошлой
+    синхронизации, и убирает рецепты, подписей которых больше нет.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.synced_at = None
+        self.signatures = {}
+        self.buckets = {}
+
+    def remove(self, recipe_id):
+        signature = self.signatures.pop(recipe_id, None)
+        if signature is not None:
+            for key in band_keys(signature):
+                self.buckets.get(key, set()).discard(recipe_id)
+
+    def add(self, recipe_id, signature):
+        self.remove(recipe_id)
+        self.signatures[recipe_id] = signature
+        for key in band_keys(signature):
+            self.buckets.setdefault(key, set()).add(recipe_id)
+
+    def refresh(self):
+        version = get_version('signatures')
+        if version == self.version:
+            return
+        with self.lock:
+            started = timezone.now()
+            rows = RecipeSignature.objects.all()
+            if self.synced_at is not None:
+                rows = rows.filter(updated__gte=self.synced_at - timedelta(
+                    seconds=settings.SIMILARITY_SYNC_SLACK
+                ))
+                existing = set(RecipeSignature.objects.values_list(
+                    'recipe_id', flat=True
+                ))
+                for recipe_id in set(self.signatures) - existing:
+                    self.remove(recipe_id)
+            for recipe_id, data in rows.values_list(
+                'recipe_id', 'minhash'
+            ).iterator():
+                self.add(recipe_id, np.frombuffer(data, dtype=np.uint32))
+            self.synced_at = started
+            self.version = version
+
+    def similar(self, recipe_id, limit):
+        """
+        id похожих рецептов по убыванию оценки сходства Жаккара.
+        """
+        self.refresh()
+        signature = self.signatures.get(recipe_id)
+        if signature is None:
+            signature = minhash(recipe_tokens([recipe_id])[recipe_id])
+        candidates = set()
+        for key in band_keys(signature):
+            candidates |= self.buckets.get(key, set())
+        candidates.discard(recipe_id)
+        scores = sorted(
+            (
+                (float(np.mean(self.signatures[pk] == signature)), pk)
+                for pk in candidates if pk in self.signatures
+            ),
+            reverse=True
+        )
+        return [pk for score, pk in scores[:limit]]
+
+
+lsh_index = LSHIndex()
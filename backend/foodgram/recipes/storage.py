@@ -0,0 +1,43 @@
+import os
+import posixpath
+from hashlib import sha256
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранит файл под sha256 его содержимого: одинаковые картинки лежат
+    на диске один раз, а повторная загрузка той же картинки ничего не
+    пишет. Имя файла не меняется вместе с содержимым, поэтому его можно
+    кэшировать навсегда.
+    """
+
+    def digest_name(self, name, content):
+        digest = sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        return posixpath.join(
+            posixpath.dirname(name), hexdigest[:2],
+            hexdigest + posixpath.splitext(name)[1].lower()
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.digest_name(name, content)
+        try:
+            # Повторная загрузка обновляет mtime: collect_images не удалит
+            # файл, ставший снова нужным, как старый и ничейный.
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super().save(name, content, max_length)
+        return name
+
+
+image_storage = ContentAddressedStorage()
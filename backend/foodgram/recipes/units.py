@@ -0,0 +1,48 @@
+import re
+
+GRAM = 'г'
+MILLILITRE = 'мл'
+PIECE = 'шт.'
+
+# Единица → (базовая единица, множитель к базовой).
+UNITS = {
+    'г': (GRAM, 1),
+    'гр': (GRAM, 1),
+    'кг': (GRAM, 1000),
+    'мл': (MILLILITRE, 1),
+    'л': (MILLILITRE, 1000),
+    'стакан': (MILLILITRE, 200),
+    'стл': (MILLILITRE, 15),
+    'чл': (MILLILITRE, 5),
+    'капля': (MILLILITRE, 0.05),
+    'шт': (PIECE, 1),
+}
+
+
+def unit_key(unit):
+    """
+    Ключ единицы без регистра, пробелов и точек: «Ст.л.» → «стл».
+    """
+    return re.sub(r'[\s.]', '', unit.lower())
+
+
+def normalize_unit(unit):
+    """
+    Базовая единица и множитель для строки measurement_unit.
+    Неизвестные единицы остаются как есть с множителем 1.
+    """
+    return UNITS.get(unit_key(unit), (unit, 1))
+
+
+def grams_per_unit(unit, unit_weight=None):
+    """
+    Сколько граммов в одной единице: unit_weight, если задан, иначе по
+    таблице единиц (объём считается с плотностью воды). None, если
+    перевести нельзя.
+    """
+    if unit_weight:
+        return unit_weight
+    base, factor = normalize_unit(unit)
+    if base in (GRAM, MILLILITRE):
+        return factor
+    return None
@@ -0,0 +1,42 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'table-version:{}'
+
+
+def get_version(name):
+    """
+    Возвращает текущую версию таблицы (время последнего изменения в нс).
+    """
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        return cache.get(key)
+    return version
+
+
+def get_versions(*names):
+    """
+    Версии нескольких таблиц за одно обращение к кэшу.
+    """
+    keys = {VERSION_KEY.format(name): name for name in names}
+    versions = cache.get_many(keys)
+    return [
+        versions.get(key) or get_version(name)
+        for key, name in keys.items()
+    ]
+
+
+def bump_version(*names):
+    """
+    Меняет версию таблиц после коммита текущей транзакции.
+    """
+    def bump():
+        version = time.time_ns()
+        cache.set_many(
+            {VERSION_KEY.format(name): version for name in names}, None
+        )
+    transaction.on_commit(bump)
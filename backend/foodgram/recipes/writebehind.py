@@ -0,0 +1,303 @@
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Favorite, Recipe, ShoppingCart, User
+from .versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Вид события → (модель, связь из Recipe, версия таблицы).
+KINDS = {
+    'favorite': (Favorite, 'in_favorite', 'favorites'),
+    'cart': (ShoppingCart, 'is_shopping_cart', 'carts'),
+}
+OVERLAY_KEY = 'toggles:{}'
+
+
+def overlay(user_id):
+    """
+    Последние события пользователя, которые могут быть ещё не записаны
+    в базу: {(вид, id рецепта): (добавлен, время в нс)}.
+    """
+    if not settings.WRITE_BEHIND or user_id is None:
+        return {}
+    return cache.get(OVERLAY_KEY.format(user_id)) or {}
+
+
+def pending_ids(kind, user_id):
+    """
+    id рецептов, добавленных и удалённых пользователем без записи в базу.
+    """
+    added, removed = set(), set()
+    for (event_kind, recipe_id), (is_added, _) in overlay(user_id).items():
+        if event_kind == kind:
+            (added if is_added else removed).add(recipe_id)
+    return added, removed
+
+
+def apply_pending(kind, user_id, recipe_ids):
+    """
+    Поправляет множество id из базы событиями из буфера.
+    """
+    added, removed = pending_ids(kind, user_id)
+    return (set(recipe_ids) | added) - removed
+
+
+def recipe_filter(kind, user_id, prefix=''):
+    """
+    Q для рецептов пользователя вида kind с учётом буфера; prefix —
+    путь до Recipe, например 'recipe__'.
+    """
+    model, relation, _ = KINDS[kind]
+    added, removed = pending_ids(kind, user_id)
+    if not added and not removed:
+        return Q(**{f'{prefix}{relation}__user': user_id})
+    query = Q(**{f'{prefix}id__in': model.objects.filter(
+        user_id=user_id
+    ).values('recipe_id')})
+    if added:
+        query |= Q(**{f'{prefix}id__in': added})
+    if removed:
+        query &= ~Q(**{f'{prefix}id__in': removed})
+    return query
+
+
+def event_time(nanoseconds):
+    return datetime.fromtimestamp(nanoseconds / 1e9, tz=timezone.utc)
+
+
+def current_events(events):
+    """
+    События без перекрытых более новыми с другого воркера: их запишет
+    тот воркер.
+    """
+    overlays = {}
+    for event in events:
+        kind, user_id, recipe_id, added, moment = event
+        if user_id not in overlays:
+            overlays[user_id] = overlay(user_id)
+        latest = overlays[user_id].get((kind, recipe_id))
+        if latest is None or latest[1] <= moment:
+            yield event
+
+
+def existing_events(events):
+    """
+    События без удалённых до записи пачки рецептов и пользователей:
+    иначе ошибка внешнего ключа откатит события всех пользователей.
+    """
+    events = list(events)
+    recipes = set(Recipe.objects.filter(
+        id__in={event[2] for event in events}
+    ).values_list('id', flat=True))
+    users = set(User.objects.filter(
+        id__in={event[1] for event in events}
+    ).values_list('id', flat=True))
+    return [
+        event for event in events
+        if event[1] in users and event[2] in recipes
+    ]
+
+
+def apply_events(events):
+    """
+    Записывает события пачкой: добавления — bulk_create без конфликтов,
+    удаления — одним DELETE на пользователя.
+    """
+    created = {kind: [] for kind in KINDS}
+    removed = {kind: {} for kind in KINDS}
+    for kind, user_id, recipe_id, added, moment in existing_events(
+        current_events(events)
+    ):
+        if added:
+            created[kind].append(KINDS[kind][0](
+                user_id=user_id, recipe_id=recipe_id,
+                created=event_time(moment)
+            ))
+        else:
+            removed[kind].setdefault(user_id, []).append(recipe_id)
+    with transaction.atomic():
+        for kind, (model, _, version) in KINDS.items():
+            model.objects.bulk_create(created[kind], ignore_conflicts=True)
+            for user_id, recipe_ids in removed[kind].items():
+                model.objects.filter(
+                    user_id=user_id, recipe_id__in=recipe_ids
+                ).delete()
+            if created[kind] or removed[kind]:
+                bump_version(version)
+
+
+def read_log(path):
+    events = []
+    with open(path) as file:
+        for line in file:
+            try:
+                events.append(tuple(json.loads(line)))
+            except ValueError:
+                # Хвост, недописанный при падении процесса.
+                break
+    return events
+
+
+class ToggleBuffer:
+    """
+    Буфер событий избранного и списка покупок в памяти воркера.
+    Событие сначала дописывается в локальный журнал (append-only, с
+    fsync), затем запоминается в памяти и в кэше для чтения своих
+    записей; в базу события уходят пачкой раз в WRITE_BEHIND_INTERVAL
+    секунд или при WRITE_BEHIND_MAX_PENDING событиях. Журналы упавших
+    процессов дописываются в базу при запуске буфера.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = {}
+        self.log = None
+        self.thread = None
+        self.pid = None
+
+    def start(self):
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.pending = {}
+        self.log = None
+        os.makedirs(settings.WRITE_BEHIND_DIR, exist_ok=True)
+        try:
+            recover_logs()
+        except Exception:
+            # Журнал остаётся на диске до следующего запуска, а буфер
+            # этого процесса работает.
+            logger.exception('Не удалось восстановить журналы событий')
+        self.thread = threading.Thread(
+            target=self.run, name='write-behind', daemon=True
+        )
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            time.sleep(settings.WRITE_BEHIND_INTERVAL)
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать буфер событий')
+
+    def open_log(self):
+        path = os.path.join(
+            settings.WRITE_BEHIND_DIR, f'toggles-{uuid.uuid4().hex}.log'
+        )
+        log = open(path, 'a')
+        fcntl.flock(log, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return log
+
+    def toggle(self, kind, user_id, recipe_id, added):
+        """
+        Принимает событие; после возврата оно переживёт падение процесса
+        и видно пользователю при следующих запросах, в том числе
+        условных.
+        """
+        self.start()
+        moment = time.time_ns()
+        event = (kind, user_id, recipe_id, added, moment)
+        with self.lock:
+            if self.log is None:
+                self.log = self.open_log()
+            self.log.write(json.dumps(event) + '\n')
+            self.log.flush()
+            if settings.WRITE_BEHIND_FSYNC:
+                os.fsync(self.log.fileno())
+            self.pending[(kind, user_id, recipe_id)] = event
+            size = len(self.pending)
+        key = OVERLAY_KEY.format(user_id)
+        events = cache.get(key) or {}
+        events[(kind, recipe_id)] = (added, moment)
+        cache.set(key, events, settings.WRITE_BEHIND_OVERLAY_TIMEOUT)
+        # Ответы с отметками пользователя меняются уже сейчас, а не при
+        # записи пачки: иначе ETag по версии отдаст 304 со старым флагом.
+        bump_version(KINDS[kind][2])
+        if size >= settings.WRITE_BEHIND_MAX_PENDING:
+            self.flush()
+
+    def flush(self):
+        """
+        Записывает накопленные события; журнал удаляется только после
+        коммита, при ошибке события возвращаются в буфер.
+        """
+        with self.flush_lock:
+            with self.lock:
+                events, self.pending = self.pending, {}
+                log, self.log = self.log, None
+            if not events:
+                if log is not None:
+                    log.close()
+                    os.remove(log.name)
+                return 0
+            try:
+                apply_events(list(events.values()))
+            except Exception:
+                with self.lock:
+                    for key, event in events.items():
+                        current = self.pending.get(key)
+                        if current is None or current[4] < event[4]:
+                            self.pending[key] = event
+                    self.keep_log(log)
+                raise
+            log.close()
+            os.remove(log.name)
+            return len(events)
+
+    def keep_log(self, log):
+        """
+        Дописывает журнал несохранённой пачки в текущий, чтобы события
+        не потерялись при падении до следующей попытки.
+        """
+        if self.log is None:
+            self.log = self.open_log()
+        log.close()
+        with open(log.name) as old:
+            self.log.write(old.read())
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        os.remove(log.name)
+
+
+def recover_logs():
+    """
+    Записывает в базу журналы процессов, которые их больше не держат.
+    """
+    recovered = 0
+    pattern = os.path.join(settings.WRITE_BEHIND_DIR, 'toggles-*.log')
+    for path in glob.glob(pattern):
+        with open(path) as file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                continue
+            latest = {}
+            for event in read_log(path):
+                latest[event[:3]] = event
+            if latest:
+                apply_events(list(latest.values()))
+            os.remove(path)
+            recovered += len(latest)
+    return recovered
+
+
+toggle_buffer = ToggleBuffer()
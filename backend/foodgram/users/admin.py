@@ -1,14 +1,20 @@
 from django.contrib import admin
+from recipes.admin import CountCachingAdmin
 
 from .models import Follow, User
 
 
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(CountCachingAdmin):
     list_display = ('username', 'first_name', 'last_name', 'email', 'role')
+    search_fields = ('^username', '^email')
+    count_versions = ('users',)
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(CountCachingAdmin):
     list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    count_versions = ('follows',)
 
 
 admin.site.register(User, UserAdmin)
@@ -0,0 +1,142 @@
+import threading
+import time
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+SEQUENCE_KEY = 'follow-graph:sequence'
+DELTA_KEY = 'follow-graph:delta:{}'
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def next_sequence():
+    cache.add(SEQUENCE_KEY, 0, None)
+    try:
+        return cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        cache.add(SEQUENCE_KEY, 0, None)
+        return cache.incr(SEQUENCE_KEY)
+
+
+def record_follow(user_id, author_id, added):
+    """
+    После коммита кладёт изменение подписки в журнал в кэше, откуда
+    графы воркеров дочитывают его вместо полной перезагрузки.
+    """
+    def record():
+        cache.set(
+            DELTA_KEY.format(next_sequence()),
+            (user_id, author_id, added),
+            settings.FOLLOW_GRAPH_DELTA_TIMEOUT
+        )
+    transaction.on_commit(record)
+
+
+class FollowGraph:
+    """
+    Подписки в памяти воркера: для каждого пользователя отсортированный
+    массив id авторов. Изменения дочитываются из журнала в кэше; если
+    журнал отстал или устарел, граф загружается заново.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sequence = None
+        self.loaded_at = 0
+        self.following = {}
+
+    def load(self):
+        rows = Follow.objects.order_by('user_id', 'author_id').values_list(
+            'user_id', 'author_id'
+        ).iterator(chunk_size=10000)
+        pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64)
+        users, authors = pairs[0::2], pairs[1::2]
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        self.following = {
+            int(user): array for user, array in zip(
+                users[starts], np.split(authors, starts[1:])
+            )
+        } if len(users) else {}
+        self.loaded_at = time.monotonic()
+
+    def apply(self, user_id, author_id, added):
+        authors = self.following.get(user_id, EMPTY)
+        position = np.searchsorted(authors, author_id)
+        present = (
+            position < len(authors) and authors[position] == author_id
+        )
+        if added and not present:
+            self.following[user_id] = np.insert(authors, position, author_id)
+        elif not added and present:
+            self.following[user_id] = np.delete(authors, position)
+
+    def refresh(self):
+        sequence = cache.get(SEQUENCE_KEY, 0)
+        if sequence == self.sequence and not self.expired():
+            return
+        with self.lock:
+            if self.sequence is not None and not self.expired():
+                pending = range(self.sequence + 1, sequence + 1)
+                if len(pending) <= settings.FOLLOW_GRAPH_MAX_DELTAS:
+                    keys = [DELTA_KEY.format(number) for number in pending]
+                    deltas = cache.get_many(keys)
+                    if len(deltas) == len(keys):
+                        for key in keys:
+                            self.apply(*deltas[key])
+                        self.sequence = sequence
+                        return
+            self.load()
+            self.sequence = sequence
+
+    def expired(self):
+        return (
+            time.monotonic() - self.loaded_at
+            > settings.FOLLOW_GRAPH_MAX_AGE
+        )
+
+    def authors(self, user_id):
+        """
+        Отсортированный массив id авторов, на которых подписан user_id.
+        """
+        self.refresh()
+        return self.following.get(user_id, EMPTY)
+
+    def is_subscribed(self, user_id, author_id):
+        authors = self.authors(user_id)
+        position = np.searchsorted(authors, author_id)
+        return bool(
+            position < len(authors) and authors[position] == author_id
+        )
+
+    def subscribed(self, user_id, author_ids):
+        """
+        Множество id из author_ids, на которых подписан user_id.
+        """
+        authors = self.authors(user_id)
+        candidates = np.fromiter(author_ids, dtype=np.int64)
+        return set(candidates[np.isin(candidates, authors)].tolist())
+
+    def suggestions(self, user_id, limit):
+        """
+        Авторы, на которых подписаны авторы пользователя: по числу
+        таких подписок, без уже отслеживаемых и самого пользователя.
+        """
+        authors = self.authors(user_id)
+        second = [self.following.get(int(author), EMPTY) for author in authors]
+        if not second:
+            return []
+        candidates, counts = np.unique(
+            np.concatenate(second), return_counts=True
+        )
+        keep = ~np.isin(candidates, authors) & (candidates != user_id)
+        candidates, counts = candidates[keep], counts[keep]
+        order = np.lexsort((candidates, -counts))[:limit]
+        return candidates[order].tolist()
+
+
+follow_graph = FollowGraph()
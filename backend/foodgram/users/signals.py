@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.versions import bump_version
+from rest_framework.authtoken.models import Token
+
+from .graph import record_follow
+from .models import Follow, User
+
+
+@receiver((post_save, post_delete), sender=User)
+def user_changed(**kwargs):
+    bump_version('users')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(instance, created, **kwargs):
+    if created:
+        record_follow(instance.user_id, instance.author_id, True)
+    bump_version('follows')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(instance, **kwargs):
+    record_follow(instance.user_id, instance.author_id, False)
+    bump_version('follows')
+
+
+@receiver((post_save, post_delete), sender=Token)
+def token_changed(**kwargs):
+    bump_version('tokens')